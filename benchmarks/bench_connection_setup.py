@@ -0,0 +1,94 @@
+"""
+Connection Setup Benchmark
+
+Measures the per-connection setup cost of the /ws endpoint when a Runner is
+built for every socket versus when one process-wide Runner is shared.
+
+A stub agent stands in for the education guide's agent graph, so the
+benchmark runs without the agent's model and tool dependencies. Runner
+setup keeps a reference to the agent and does not walk it, so the graph's
+size does not change the comparison.
+
+Run from the repository root:
+    python -m benchmarks.bench_connection_setup
+"""
+
+import time
+import tracemalloc
+import uuid
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from education_guide_agent.utils.state_utils import initialize_state
+
+APP_NAME = "education_guide"
+USER_ID = "user"
+CONNECTIONS = 5000
+
+root_agent = Agent(
+    name="education_guide",
+    model="gemini-2.0-flash",
+    instruction="Stub agent for measuring connection setup."
+)
+
+def _create_session(session_service):
+    """Create a fresh session as the handshake does for a new client."""
+    return session_service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=str(uuid.uuid4()),
+        state=initialize_state()
+    )
+
+def setup_with_runner_per_connection(session_service):
+    """Connection setup as it was: a new Runner for every socket."""
+    session = _create_session(session_service)
+    runner = Runner(
+        agent=root_agent,
+        app_name=APP_NAME,
+        session_service=session_service
+    )
+    return session, runner
+
+def setup_with_shared_runner(session_service, runner):
+    """Connection setup with the process-wide Runner."""
+    session = _create_session(session_service)
+    return session, runner
+
+def measure(label, setup) -> None:
+    """Run the setup for many live connections and report time and memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Keep every connection's objects alive, as open sockets would
+    connections = [setup() for _ in range(CONNECTIONS)]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<28} {elapsed / CONNECTIONS * 1e6:8.1f} us/connection "
+        f"{current / CONNECTIONS:10.0f} bytes/connection "
+        f"({len(connections)} connections)"
+    )
+
+def main():
+    print(f"Setting up {CONNECTIONS} connections\n")
+
+    service = InMemorySessionService()
+    measure(
+        "runner per connection",
+        lambda: setup_with_runner_per_connection(service)
+    )
+
+    service = InMemorySessionService()
+    shared_runner = Runner(
+        agent=root_agent,
+        app_name=APP_NAME,
+        session_service=service
+    )
+    measure(
+        "shared runner",
+        lambda: setup_with_shared_runner(service, shared_runner)
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Wire Format Benchmark
+
+Compares bytes on the wire and encode time of the websocket wire formats for
+session.state payloads of realistic sizes.
+
+Run from the repository root:
+    python -m benchmarks.bench_wire_format
+"""
+
+import time
+from datetime import datetime
+from education_guide_agent.utils.goal_store import GoalStore
+from education_guide_agent.utils.state_utils import state_default
+from education_guide_agent.utils.wire_format import (
+    WireCodec,
+    available_formats,
+    decode_frame,
+    FORMATS,
+    COMPRESSIONS
+)
+
+HISTORY_SIZES = (10, 100, 1000)
+REPEAT = 50
+
+def build_state(history_size: int):
+    """Build a session state with a filled profile and some history."""
+    profile = {}
+    state = {
+        "user_info": state_default("user_info"),
+        "session_data": {"user_profile": profile}
+    }
+    profile["background"] = {
+        "country": "Nigeria",
+        "travel_experience": True,
+        "education_challenges": "Taught myself to code during school closures"
+    }
+    profile["academic"] = {
+        "gpa": 4.5,
+        "gpa_scale": "5.0",
+        "english_proficiency": "native",
+        "test_scores": {"SAT": 1450}
+    }
+    profile["university_preferences"] = {
+        "field_of_study": "Computer Science",
+        "target_universities": ["Stanford", "Duke", "MIT", "Georgia Tech"],
+        "regions": ["East Coast", "Midwest"]
+    }
+    profile["extracurriculars"] = {
+        "activities": ["coding club", "chess", "tutoring program lead"]
+    }
+    GoalStore(state).add({
+        "type": "test_prep",
+        "description": "Reach 1450+ on the SAT",
+        "deadline": "2026-12-01",
+        "priority": "high",
+        "status": "pending",
+        "milestones": [],
+        "created_at": str(datetime.now())
+    })
+    state["session_data"]["interaction_history"] = [
+        {
+            "action": "Analyzed university fit",
+            "data": {
+                "academic": profile["academic"],
+                "preferences": profile["university_preferences"]
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+        for _ in range(history_size)
+    ]
+    return state
+
+def measure(codec: WireCodec, message) -> tuple:
+    """Encode a message repeatedly and return (bytes, microseconds per encode)."""
+    frame = codec.encode(message)
+    assert decode_frame(frame, codec.format) is not None
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        codec.encode(message)
+    elapsed = (time.perf_counter() - start) / REPEAT
+    size = len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+    return size, elapsed * 1e6
+
+def main():
+    available = available_formats()
+    print("Available:", ", ".join(name for name, ok in available.items() if ok))
+    for history_size in HISTORY_SIZES:
+        message = {"type": "state", "version": 1, "state": build_state(history_size)}
+        print(f"\nstate with {history_size} history entries")
+        print(f"{'format':<10} {'compress':<10} {'bytes':>10} {'encode us':>12}")
+        for fmt in FORMATS:
+            if not available[fmt]:
+                continue
+            for compression in COMPRESSIONS:
+                if compression != "none" and not available[compression]:
+                    continue
+                size, micros = measure(WireCodec(fmt, compression), message)
+                print(f"{fmt:<10} {compression:<10} {size:>10} {micros:>12.1f}")
+
+if __name__ == "__main__":
+    main()
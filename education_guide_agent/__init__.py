@@ -2,8 +2,18 @@
 Education Guide Agent
 
 A comprehensive education guide for college applications.
+
+The agent graph is imported on first access to `root_agent` (or the `agent`
+submodule), so importing the package or its web/API modules stays cheap.
 """
 
-from .agent import root_agent
+import importlib
+
+__all__ = ['root_agent']
 
-__all__ = ['root_agent']
\ No newline at end of file
+def __getattr__(name):
+    if name == 'agent':
+        return importlib.import_module('.agent', __name__)
+    if name == 'root_agent':
+        return importlib.import_module('.agent', __name__).root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,18 +4,25 @@ Main entry point for the Education Guide Agent.
 
 import uuid
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from .utils.state_utils import initialize_state
+from .utils.session_backends import create_session_service
 from .agent import root_agent
 
 # Create session service
-session_service = InMemorySessionService()
+session_service = create_session_service()
 
 # Constants
 APP_NAME = "Education-Guardian-Agent-Project"
 USER_ID = "user" 
 SESSION_ID = str(uuid.uuid4())
 
+# Create runner with session service
+runner = Runner(
+    agent=root_agent,
+    app_name=APP_NAME,
+    session_service=session_service
+)
+
 def main():
     # Initialize session with default state
     initial_state = initialize_state()
@@ -28,13 +35,6 @@ def main():
     
     print(f"Created new session: {SESSION_ID}")
     
-    # Create runner with session service
-    runner = Runner(
-        agent=root_agent,
-        app_name=APP_NAME,
-        session_service=session_service
-    )
-    
     # Start the agent
     print("\nEducation Guide Agent is ready!")
     print("Type 'quit' to exit")
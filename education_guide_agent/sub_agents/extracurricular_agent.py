@@ -13,7 +13,8 @@ from ..utils.state_utils import (
     get_university_preferences,
     get_extracurriculars,
     get_aspirations,
-    update_interaction_history
+    update_interaction_history,
+    log_profile_analysis
 )
 import google.adk as adk
 import os
@@ -36,11 +37,10 @@ def analyze_activity_profile(tool_context) -> Dict[str, Any]:
     activities = get_extracurriculars(tool_context)
     aspirations = get_aspirations(tool_context)
     
-    # Log the analysis
-    update_interaction_history(
+    # Log the analysis with snapshot references to the profile sections
+    log_profile_analysis(
         tool_context,
         "Analyzed activity profile",
-        "success",
         {
             "background": background,
             "academic": academic,
@@ -168,8 +168,7 @@ def generate_activity_recommendations(tool_context) -> Dict[str, Any]:
     update_interaction_history(
         tool_context,
         "Generated activity recommendations",
-        "success",
-        {"recommendations": recommendations}
+        {"status": "success", "recommendations": recommendations}
     )
     
     return {
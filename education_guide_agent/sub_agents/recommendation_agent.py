@@ -12,7 +12,8 @@ from ..utils.state_utils import (
     get_university_preferences,
     get_application_readiness,
     get_extracurriculars,
-    update_interaction_history
+    update_interaction_history,
+    log_profile_analysis
 )
 import google.adk as adk
 import os
@@ -34,11 +35,10 @@ def analyze_recommendation_needs(tool_context) -> Dict[str, Any]:
     readiness = get_application_readiness(tool_context)
     activities = get_extracurriculars(tool_context)
     
-    # Log the analysis
-    update_interaction_history(
+    # Log the analysis with snapshot references to the profile sections
+    log_profile_analysis(
         tool_context,
         "Analyzed recommendation needs",
-        "success",
         {
             "academic": academic,
             "universities": universities,
@@ -134,8 +134,7 @@ def generate_recommender_guidance(tool_context) -> Dict[str, Any]:
     update_interaction_history(
         tool_context,
         "Generated recommender guidance",
-        "success",
-        {"guidance": guidance}
+        {"status": "success", "guidance": guidance}
     )
     
     return {
@@ -11,7 +11,7 @@ from ..utils.state_utils import (
     get_academic_profile,
     get_university_preferences,
     get_application_readiness,
-    update_interaction_history
+    log_profile_analysis
 )
 import google.adk as adk
 import os
@@ -33,11 +33,10 @@ def analyze_test_requirements(tool_context) -> Dict[str, Any]:
     university_preferences = get_university_preferences(tool_context)
     application_readiness = get_application_readiness(tool_context)
     
-    # Log the analysis
-    update_interaction_history(
+    # Log the analysis with snapshot references to the profile sections
+    log_profile_analysis(
         tool_context,
         "Analyzed test requirements",
-        "success",
         {
             "academic_profile": academic_profile,
             "university_preferences": university_preferences,
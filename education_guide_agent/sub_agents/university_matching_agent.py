@@ -14,7 +14,8 @@ from ..utils.state_utils import (
     get_financial_constraints,
     get_extracurriculars,
     get_aspirations,
-    update_interaction_history
+    update_interaction_history,
+    log_profile_analysis
 )
 import google.adk as adk
 import os
@@ -39,11 +40,10 @@ def analyze_university_fit(tool_context) -> Dict[str, Any]:
     activities = get_extracurriculars(tool_context)
     aspirations = get_aspirations(tool_context)
     
-    # Log the analysis
-    update_interaction_history(
+    # Log the analysis with snapshot references to the profile sections
+    log_profile_analysis(
         tool_context,
         "Analyzed university fit",
-        "success",
         {
             "background": background,
             "academic": academic,
@@ -117,8 +117,7 @@ def generate_university_recommendations(tool_context) -> Dict[str, Any]:
     update_interaction_history(
         tool_context,
         "Generated university recommendations",
-        "success",
-        {"recommendations": recommendations}
+        {"status": "success", "recommendations": recommendations}
     )
     
     return {
@@ -6,21 +6,11 @@ This tool helps establish and track goals for the college application process.
 
 from typing import Dict, Any, List, Optional
 from google.adk.tools import ToolContext
-from ..utils.state_utils import update_state, get_session_state
+from ..utils.state_utils import merge_patch, state_transaction
+from ..utils.goal_store import GoalStore
+from ..utils.state_schemas import StateValidationError, validate_goal, validate_profile_section
 from datetime import datetime
 
-def get_session_state(tool_context: ToolContext) -> Dict[str, Any]:
-    """
-    Get the current session state.
-    
-    Args:
-        tool_context: The tool context containing session information
-        
-    Returns:
-        Dict containing the current session state
-    """
-    return tool_context.session.state
-
 def set_goal(
     tool_context: ToolContext,
     goal_type: str,
@@ -47,15 +37,8 @@ def set_goal(
         return {"error": "Tool context is required"}
     
     try:
-        # Get current state
-        state = get_session_state(tool_context)
-        
-        # Initialize goals if not present
-        if "goals" not in state:
-            state["goals"] = []
-        
         # Create new goal
-        new_goal = {
+        new_goal = validate_goal({
             "type": goal_type,
             "description": description,
             "deadline": deadline,
@@ -63,35 +46,37 @@ def set_goal(
             "status": "pending",
             "milestones": [],
             "created_at": str(datetime.now())
-        }
-        
-        # Add goal to state
-        state["goals"].append(new_goal)
+        })
         
-        # Update user profile with preliminary information if provided
+        # Validate preliminary information before anything is stored
         if preliminary_questions:
-            if "user_profile" not in state:
-                state["user_profile"] = {}
-            
-            # Update user profile sections
-            for section, data in preliminary_questions.items():
-                state["user_profile"][section] = data
+            preliminary_questions = {
+                section: validate_profile_section(section, data)
+                for section, data in preliminary_questions.items()
+            }
         
-        # Update state
-        update_state(tool_context, state)
+        with state_transaction(tool_context) as transaction:
+            # Add the goal under its own key
+            goals = GoalStore(transaction)
+            new_goal = goals.add(new_goal)
+            
+            # Update user profile with preliminary information if provided
+            if preliminary_questions:
+                merge_patch(transaction, {
+                    "session_data": {"user_profile": preliminary_questions}
+                })
         
         return {
             "result": "Goal set successfully",
             "goal": new_goal,
             "stats": {
-                "total_goals": len(state["goals"]),
-                "goals_by_type": {
-                    goal["type"]: len([g for g in state["goals"] if g["type"] == goal["type"]])
-                    for goal in state["goals"]
-                }
+                "total_goals": len(goals),
+                "goals_by_type": goals.count("type")
             }
         }
         
+    except StateValidationError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {
             "error": f"Failed to set goal: {str(e)}",
@@ -4,9 +4,15 @@ Location Tool
 This module provides a tool for getting and managing user location information.
 """
 
+import time
 from typing import Dict, Any, Optional, Union
 from google.adk.tools import ToolContext
-from ..utils.state_utils import update_interaction_history, update_state
+from ..utils.location_utils import RECEIVED_AT_KEY, add_fixes
+from ..utils.state_utils import (
+    update_interaction_history,
+    update_user_info,
+    state_transaction
+)
 
 def get_location(
     latitude: Union[float, None] = None,
@@ -75,41 +81,30 @@ def get_location(
             "longitude": longitude,
             "name": location_name,
             "detection_method": "manual_input",
-            "timestamp": tool_context.state.get("current_time", "")
+            "timestamp": tool_context.state.get("current_time", ""),
+            RECEIVED_AT_KEY: time.time()
         }
         
-        # Get current locations from state
-        locations = tool_context.state.get("locations", [])
-        
-        # Add new location
-        locations.append(location)
-        
-        # Update state using session service
-        update_state(
-            tool_context.session_service,
-            tool_context.app_name,
-            tool_context.user_id,
-            tool_context.session_id,
-            {
-                "locations": locations,
-                "user_info": {
-                    **tool_context.state.get("user_info", {}),
-                    "location": location
+        # Record the location, the user's current location and the history
+        # entry as one state write; nothing is kept if any step fails
+        with state_transaction(tool_context) as transaction:
+            # Stored the same way as fixes sent to /api/location
+            locations, accepted = add_fixes(transaction.get("locations", []), [location])
+            if accepted:
+                transaction["locations"] = locations
+            
+            update_user_info(transaction, {"location": location})
+            
+            update_interaction_history(
+                transaction,
+                "location_set",
+                {
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "location_name": location_name,
+                    "detection_method": "manual_input"
                 }
-            }
-        )
-        
-        # Update interaction history
-        update_interaction_history(
-            tool_context,
-            "location_set",
-            {
-                "latitude": latitude,
-                "longitude": longitude,
-                "location_name": location_name,
-                "detection_method": "manual_input"
-            }
-        )
+            )
         
         return {
             "result": {
@@ -6,7 +6,8 @@ This tool manages user profile information for the education guide agent.
 
 from typing import Dict, Any, Optional, Union, List
 from google.adk.tools import ToolContext
-from ..utils.state_utils import update_interaction_history, update_state, get_session_state
+from ..utils.state_utils import get_user_profile, merge_patch, state_transaction
+from ..utils.state_schemas import StateValidationError, validate_profile_section
 
 def update_user_profile(
     tool_context: ToolContext,
@@ -42,41 +43,45 @@ def update_user_profile(
         return {"error": "Tool context is required"}
     
     try:
-        # Get current state
-        state = get_session_state(tool_context)
-        
-        # Initialize user profile if not present
-        if "user_profile" not in state:
-            state["user_profile"] = {}
-        
-        # Update only provided fields
-        if gpa is not None:
-            state["user_profile"]["gpa"] = gpa
-        if gpa_scale is not None:
-            state["user_profile"]["gpa_scale"] = gpa_scale
-        if academic_history is not None:
-            state["user_profile"]["academic_history"] = academic_history
+        # Validate and coerce the provided fields by the section they belong to
+        sections = {
+            "academic": {
+                "gpa": gpa,
+                "gpa_scale": gpa_scale,
+                "academic_history": academic_history,
+                "test_scores": test_scores,
+                "field_of_study": field_of_study
+            },
+            "background": {"country": country},
+            "extracurriculars": {"hobbies": hobbies},
+            "financial_constraints": {"financial_needs": financial_needs}
+        }
+        validated = {}
+        for section, fields in sections.items():
+            provided = {key: value for key, value in fields.items() if value is not None}
+            if provided:
+                validated[section] = validate_profile_section(section, provided)
         if university_preferences is not None:
-            state["user_profile"]["university_preferences"] = university_preferences
-        if hobbies is not None:
-            state["user_profile"]["hobbies"] = hobbies
-        if country is not None:
-            state["user_profile"]["country"] = country
+            validated["university_preferences"] = validate_profile_section(
+                "university_preferences", university_preferences
+            )
         if field_of_study is not None:
-            state["user_profile"]["field_of_study"] = field_of_study
-        if financial_needs is not None:
-            state["user_profile"]["financial_needs"] = financial_needs
-        if test_scores is not None:
-            state["user_profile"]["test_scores"] = test_scores
+            validated.setdefault("university_preferences", {})["field_of_study"] = (
+                validated["academic"]["field_of_study"]
+            )
         
-        # Update state
-        update_state(tool_context, state)
+        # Merge only the provided fields into their profile sections
+        with state_transaction(tool_context) as transaction:
+            merge_patch(transaction, {"session_data": {"user_profile": validated}})
+            profile = get_user_profile(transaction)
         
         return {
             "result": "User profile updated successfully",
-            "profile": state["user_profile"]
+            "profile": profile
         }
         
+    except StateValidationError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {
             "error": f"Failed to update user profile: {str(e)}",
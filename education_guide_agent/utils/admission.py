@@ -0,0 +1,99 @@
+"""
+Admission Control Utilities
+
+This module provides a first-come, first-served gate that limits how many agent
+turns run at once and tells callers where they are in the queue.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+class TurnGate:
+    """
+    Limit the number of agent turns in flight on a worker.
+
+    Unlike a plain semaphore, the gate exposes how many turns are running and
+    waiting, and reports a caller's queue position when it has to wait.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximum number of turns allowed to run at once
+        """
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        """Number of turns waiting for a slot."""
+        return len(self._waiters)
+
+    def is_saturated(self) -> bool:
+        """Whether a new turn would have to wait."""
+        return self.active >= self.limit or bool(self._waiters)
+
+    async def acquire(
+        self,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> None:
+        """
+        Wait for a free slot.
+
+        Args:
+            on_queued: Optional callback awaited with the 1-based queue position
+                when the caller cannot be admitted immediately
+        """
+        if not self.is_saturated():
+            self.active += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            if on_queued:
+                await on_queued(len(self._waiters))
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self) -> None:
+        """Release a slot, handing it directly to the oldest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+    ):
+        """Hold a slot for the duration of a block."""
+        await self.acquire(on_queued)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self) -> Dict[str, int]:
+        """Get the gate's current load figures."""
+        return {
+            "turns_in_flight": self.active,
+            "turns_queued": self.waiting,
+            "max_concurrent_turns": self.limit
+        }
@@ -0,0 +1,259 @@
+"""
+Bounded Session Service
+
+This module provides an in-memory session service whose resident size is
+bounded.
+
+Each resident session's serialized size is tracked against a byte budget
+(SESSION_CACHE_MAX_BYTES). A session is measured in full once, when it is
+created or rehydrated; each appended event then adds its own serialized size
+and that of its state delta, so a write costs O(event), not O(session). The
+running figure can overstate a session whose delta replaced large values,
+which only makes eviction earlier. Sessions idle for longer than SESSION_IDLE_TTL
+seconds, and the least recently used sessions while the budget is exceeded,
+are hibernated: written to a gzip-compressed JSON file under
+SESSION_HIBERNATE_DIR and dropped from memory. A hibernated session is
+rehydrated on its next read or write, so callers never see the difference.
+
+Hibernation files belong to the process that wrote them and are removed by
+close(), matching the lifetime of InMemorySessionService.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse
+)
+
+# Maximum total serialized size of resident sessions (bytes)
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Seconds a session may stay idle before it is hibernated
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+
+# Directory holding hibernated sessions, one subdirectory per process
+SESSION_HIBERNATE_DIR = os.getenv("SESSION_HIBERNATE_DIR", "session_hibernation")
+
+SessionKey = Tuple[str, str, str]
+
+class BoundedSessionService(InMemorySessionService):
+    """An in-memory session service with a byte budget, idle TTL and LRU hibernation."""
+
+    def __init__(
+        self,
+        max_bytes: int = SESSION_CACHE_MAX_BYTES,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        hibernate_dir: str = SESSION_HIBERNATE_DIR
+    ):
+        """
+        Args:
+            max_bytes: Maximum total serialized size of resident sessions
+            idle_ttl: Seconds a session may stay idle before hibernation
+            hibernate_dir: Directory for hibernated sessions
+        """
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.hibernate_dir = os.path.join(hibernate_dir, uuid.uuid4().hex)
+
+        # Resident sessions, least recently used first, with their last use
+        self._lru: "OrderedDict[SessionKey, float]" = OrderedDict()
+
+        # Serialized size of each resident session; None until measured
+        self._sizes: Dict[SessionKey, Optional[int]] = {}
+        self._resident_bytes = 0
+
+        # Resident sessions waiting to be measured
+        self._unmeasured: Set[SessionKey] = set()
+
+        # Hibernated sessions and their last update time
+        self._hibernated: Dict[SessionKey, float] = {}
+
+        atexit.register(self.close)
+
+    def _path(self, key: SessionKey) -> str:
+        """Get the hibernation file of a session."""
+        app_name, user_id, session_id = key
+        return os.path.join(self.hibernate_dir, app_name, user_id, f"{session_id}.json.gz")
+
+    def _touch(self, key: SessionKey, changed: bool = False) -> None:
+        """Mark a resident session as just used, and as resized if it changed."""
+        self._lru[key] = time.monotonic()
+        self._lru.move_to_end(key)
+        if changed or key not in self._sizes:
+            self._resident_bytes -= self._sizes.get(key) or 0
+            self._sizes[key] = None
+            self._unmeasured.add(key)
+
+    def _grow(self, key: SessionKey, event: Event) -> None:
+        """Add an appended event to a measured session's size."""
+        size = self._sizes.get(key)
+        if size is None:
+            return
+        added = len(event.model_dump_json())
+        if event.actions and event.actions.state_delta:
+            added += len(json.dumps(event.actions.state_delta, default=str))
+        self._sizes[key] = size + added
+        self._resident_bytes += added
+
+    def _measure(self) -> None:
+        """Measure the sessions that changed since they were last measured."""
+        while self._unmeasured:
+            key = self._unmeasured.pop()
+            session = self.sessions[key[0]][key[1]][key[2]]
+            size = len(session.model_dump_json())
+            self._sizes[key] = size
+            self._resident_bytes += size
+
+    def _forget(self, key: SessionKey) -> Optional[Session]:
+        """Drop a session from memory and from the accounting."""
+        self._lru.pop(key, None)
+        self._unmeasured.discard(key)
+        self._resident_bytes -= self._sizes.pop(key, None) or 0
+        app_name, user_id, session_id = key
+        return self.sessions.get(app_name, {}).get(user_id, {}).pop(session_id, None)
+
+    def _hibernate(self, key: SessionKey) -> None:
+        """Write a resident session to disk and drop it from memory."""
+        session = self._forget(key)
+        if session is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            f.write(session.model_dump_json(exclude_none=True))
+        os.replace(temp_path, path)
+        self._hibernated[key] = session.last_update_time
+
+    def _rehydrate(self, key: SessionKey) -> None:
+        """Load a hibernated session back into memory."""
+        if key not in self._hibernated:
+            return
+        path = self._path(key)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            session = Session.model_validate_json(f.read())
+        app_name, user_id, session_id = key
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = session
+        del self._hibernated[key]
+        os.remove(path)
+        self._touch(key)
+
+    def _evict(self, keep: Optional[SessionKey] = None) -> None:
+        """
+        Hibernate idle sessions, then least recently used ones over budget.
+
+        Args:
+            keep: A session that must stay resident (the one just used)
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._lru:
+            key, last_used = next(iter(self._lru.items()))
+            if last_used > cutoff or key == keep:
+                break
+            self._hibernate(key)
+
+        self._measure()
+        while self._resident_bytes > self.max_bytes and len(self._lru) > 1:
+            key = next(iter(self._lru))
+            if key == keep:
+                self._lru.move_to_end(key)
+                continue
+            self._hibernate(key)
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
+    ) -> Session:
+        session = super().create_session(
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        self._hibernated.pop(key, None)
+        self._touch(key, changed=True)
+        self._evict(keep=key)
+        return session
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        self._rehydrate(key)
+        session = super().get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=config
+        )
+        if session is not None:
+            self._touch(key)
+            self._evict(keep=key)
+        return session
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        response = super().list_sessions(app_name=app_name, user_id=user_id)
+        for (app, user, session_id), update_time in self._hibernated.items():
+            if app == app_name and user == user_id:
+                response.sessions.append(Session(
+                    app_name=app,
+                    user_id=user,
+                    id=session_id,
+                    last_update_time=update_time
+                ))
+        return response
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        if self._hibernated.pop(key, None) is not None:
+            os.remove(self._path(key))
+        self._forget(key)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        # The caller's copy may outlive the resident one
+        self._rehydrate(key)
+        event = super().append_event(session=session, event=event)
+        if key in self._lru:
+            self._touch(key)
+            if not event.partial:
+                self._grow(key, event)
+            self._evict(keep=key)
+        return event
+
+    def metrics(self) -> Dict[str, Any]:
+        """Report the cache's residency figures."""
+        self._measure()
+        return {
+            "sessions_resident": len(self._lru),
+            "sessions_hibernated": len(self._hibernated),
+            "resident_bytes": self._resident_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+    def close(self) -> None:
+        """Remove this process's hibernation files."""
+        shutil.rmtree(self.hibernate_dir, ignore_errors=True)
+        self._hibernated.clear()
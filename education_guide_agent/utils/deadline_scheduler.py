@@ -0,0 +1,324 @@
+"""
+Deadline Scheduler
+
+This module keeps one priority queue of goal and milestone deadlines across
+all sessions a worker has seen, so due reminders are found without scanning
+sessions.
+
+A session's goals are parsed when sync_session() is given its state (the web
+app does this when a client connects and after a turn that changed goals).
+Each dated goal and milestone becomes a queue entry keyed by (session id,
+goal id, milestone index), with -1 as the index of the goal itself. After a
+turn only the goals it wrote are re-synced, and a reconnect whose goals are
+at the revision already synced costs nothing. Replaced and removed entries
+are left in the heap and skipped when they surface, and the heap is rebuilt
+once they outnumber live entries.
+
+Goals that are no longer open (see goal_store.OPEN_STATUSES) and milestones
+marked done are not scheduled.
+
+Sent reminders are recorded in the session's "deadline_reminders" state
+(see reminder_markers), so a restarted worker does not send them again.
+
+The queue lives in the worker process: it holds only the sessions synced
+since the worker started, so a session's reminders resume once a client
+reconnects to it after a restart.
+"""
+
+import heapq
+import itertools
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .goal_store import (
+    INDEX_KEY,
+    OPEN_STATUSES,
+    goal_key,
+    iter_goals,
+    iter_heap,
+    normalize_deadline
+)
+
+# How long before a deadline its reminder is sent (seconds)
+DEADLINE_REMINDER_LEAD = float(os.getenv("DEADLINE_REMINDER_LEAD", str(24 * 60 * 60)))
+
+# Seconds between sweeps for due reminders
+DEADLINE_SWEEP_INTERVAL = float(os.getenv("DEADLINE_SWEEP_INTERVAL", "30"))
+
+MILESTONE_DEADLINE_KEYS = ("deadline", "due_date", "due", "date")
+MILESTONE_TITLE_KEYS = ("title", "description", "name")
+
+# State key of the reminders already sent: "<goal id>:<milestone index>" ->
+# the due time the reminder was sent for
+REMINDERS_KEY = "deadline_reminders"
+
+ItemKey = Tuple[str, int, int]
+
+def _marker(key: ItemKey) -> str:
+    """Get the state key under which an item's sent reminder is recorded."""
+    return f"{key[1]}:{key[2]}"
+
+def reminder_markers(state: Mapping[str, Any], reminders: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Record sent reminders in a session's reminder markers.
+
+    Only the latest due time is kept per item, so the markers stay bounded by
+    the number of dated goals and milestones.
+
+    Args:
+        state: The session state holding "deadline_reminders"
+        reminders: Reminders returned by pop_due() for that session
+
+    Returns:
+        The new value for the session's "deadline_reminders" key
+    """
+    markers = dict(state.get(REMINDERS_KEY) or {})
+    for reminder in reminders:
+        key = (reminder["session_id"], reminder["goal_id"], reminder.get("milestone", -1))
+        markers[_marker(key)] = reminder["due_at"]
+    return markers
+
+@lru_cache(maxsize=4096)
+def _parse_deadline(deadline: str) -> Optional[float]:
+    """Parse a deadline string; repeated deadlines are parsed once."""
+    normalized = normalize_deadline(deadline)
+    if normalized is None:
+        return None
+    return datetime.fromisoformat(normalized).timestamp()
+
+def parse_deadline(deadline: Any) -> Optional[float]:
+    """
+    Get the timestamp of a deadline.
+
+    Args:
+        deadline: An ISO date or datetime string
+
+    Returns:
+        Seconds since the epoch (local time for naive values), or None if it
+        does not parse
+    """
+    if not isinstance(deadline, str):
+        return None
+    return _parse_deadline(deadline)
+
+def _milestone_fields(milestone: Any) -> Tuple[Any, Any, bool]:
+    """Get a milestone's deadline, title and whether it is done."""
+    if not isinstance(milestone, dict):
+        return None, milestone, False
+    deadline = next((milestone[k] for k in MILESTONE_DEADLINE_KEYS if k in milestone), None)
+    title = next((milestone[k] for k in MILESTONE_TITLE_KEYS if k in milestone), None)
+    done = bool(milestone.get("completed")) or milestone.get("status") == "completed"
+    return deadline, title, done
+
+class DeadlineScheduler:
+    """A cross-session priority queue of goal and milestone deadlines."""
+
+    def __init__(self, lead_seconds: float = DEADLINE_REMINDER_LEAD):
+        """
+        Args:
+            lead_seconds: How long before a deadline its reminder is due
+        """
+        self.lead_seconds = lead_seconds
+
+        # Min-heap of (due time, sequence number, item key)
+        self._heap: List[Tuple[float, int, ItemKey]] = []
+
+        # Live entries: item key -> (due time, sequence number, reminder)
+        self._entries: Dict[ItemKey, Tuple[float, int, Dict[str, Any]]] = {}
+
+        # Item keys of each session, by goal id
+        self._by_session: Dict[str, Dict[int, Set[ItemKey]]] = {}
+
+        # Goal index revision each session was last synced at
+        self._revisions: Dict[str, Any] = {}
+
+        # (item key, due time) pairs already reminded, per session
+        self._reminded: Dict[str, Set[Tuple[ItemKey, float]]] = {}
+
+        self._sequence = itertools.count()
+
+    def _push(self, key: ItemKey, due: float, reminder: Dict[str, Any]) -> None:
+        """Schedule an item, replacing any earlier entry for it."""
+        if (key, due) in self._reminded.get(key[0], ()):
+            return
+        sequence = next(self._sequence)
+        self._entries[key] = (due, sequence, reminder)
+        self._by_session.setdefault(key[0], {}).setdefault(key[1], set()).add(key)
+        heapq.heappush(self._heap, (due, sequence, key))
+
+    def _is_live(self, entry: Tuple[float, int, ItemKey]) -> bool:
+        """Check whether a heap entry is still the current one for its item."""
+        live = self._entries.get(entry[2])
+        return live is not None and live[1] == entry[1]
+
+    def _compact(self) -> None:
+        """Rebuild the heap once stale entries outnumber live ones."""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(due, sequence, key) for key, (due, sequence, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def remove_session(self, session_id: str, forget: bool = False) -> None:
+        """
+        Unschedule every item of a session.
+
+        Args:
+            session_id: The session's id
+            forget: Also forget which reminders were sent, as when the
+                session is deleted
+        """
+        if forget:
+            self._reminded.pop(session_id, None)
+        self._revisions.pop(session_id, None)
+        for keys in self._by_session.pop(session_id, {}).values():
+            for key in keys:
+                self._entries.pop(key, None)
+        self._compact()
+
+    def _load_markers(self, session_id: str, state: Mapping[str, Any]) -> None:
+        """Add the reminders recorded in a session's state to the sent set."""
+        reminded = self._reminded.setdefault(session_id, set())
+        for marker, due in (state.get(REMINDERS_KEY) or {}).items():
+            try:
+                goal_id, milestone = (int(part) for part in marker.split(":"))
+                reminded.add(((session_id, goal_id, milestone), float(due)))
+            except (TypeError, ValueError):
+                continue
+
+    def _unschedule_goal(self, session_id: str, goal_id: int) -> None:
+        """Unschedule a goal and its milestones."""
+        for key in self._by_session.get(session_id, {}).pop(goal_id, ()):
+            self._entries.pop(key, None)
+
+    def sync_session(
+        self,
+        session_id: str,
+        state: Mapping[str, Any],
+        goal_ids: Optional[Iterable[int]] = None
+    ) -> int:
+        """
+        Schedule the open goals and milestones of a session.
+
+        Args:
+            session_id: The session's id
+            state: The session state holding the goals
+            goal_ids: Re-sync only these goals, as after a turn that wrote
+                them; by default every goal is synced, unless the session
+                was already synced at its current goal index revision
+
+        Returns:
+            The number of items scheduled for the session
+        """
+        revision = (state.get(INDEX_KEY) or {}).get("revision")
+        if goal_ids is None:
+            if revision is not None and self._revisions.get(session_id) == revision:
+                return self._count(session_id)
+            self.remove_session(session_id)
+            self._load_markers(session_id, state)
+            goals = iter_goals(state)
+        else:
+            goals = []
+            for goal_id in goal_ids:
+                self._unschedule_goal(session_id, goal_id)
+                goal = state.get(goal_key(goal_id))
+                if isinstance(goal, dict):
+                    goals.append(goal)
+            self._compact()
+        self._revisions[session_id] = revision
+
+        for goal in goals:
+            if goal.get("status", "pending") not in OPEN_STATUSES:
+                continue
+            goal_id = goal["id"]
+            due = parse_deadline(goal.get("deadline"))
+            if due is not None:
+                self._push((session_id, goal_id, -1), due, {
+                    "session_id": session_id,
+                    "goal_id": goal_id,
+                    "kind": "goal",
+                    "title": goal.get("description"),
+                    "deadline": goal.get("deadline")
+                })
+            for index, milestone in enumerate(goal.get("milestones") or []):
+                deadline, title, done = _milestone_fields(milestone)
+                due = None if done else parse_deadline(deadline)
+                if due is not None:
+                    self._push((session_id, goal_id, index), due, {
+                        "session_id": session_id,
+                        "goal_id": goal_id,
+                        "milestone": index,
+                        "kind": "milestone",
+                        "title": title,
+                        "deadline": deadline
+                    })
+        return self._count(session_id)
+
+    def _count(self, session_id: str) -> int:
+        """Get the number of items scheduled for a session."""
+        return sum(len(keys) for keys in self._by_session.get(session_id, {}).values())
+
+    def next_due(self, limit: int = 10, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the items with the nearest deadlines without removing them.
+
+        Args:
+            limit: Maximum number of items to return
+            session_id: Only return items of this session
+
+        Returns:
+            Reminder dicts with a "due_at" timestamp, nearest first
+        """
+        items = []
+        for entry in iter_heap(self._heap):
+            if len(items) >= limit:
+                break
+            if not self._is_live(entry) or (session_id and entry[2][0] != session_id):
+                continue
+            items.append({**self._entries[entry[2]][2], "due_at": entry[0]})
+        return items
+
+    def pop_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Remove and return the items whose reminders are due.
+
+        An item's reminder is due lead_seconds before its deadline. Each item
+        is returned once per deadline; re-syncing its session does not
+        schedule it again unless its deadline changed. Record the returned
+        reminders in their sessions' state with reminder_markers() so they
+        are not sent again after a restart.
+
+        Args:
+            now: The current time, defaulting to time.time()
+
+        Returns:
+            Reminder dicts with "due_at" and "due_in_seconds", nearest first
+        """
+        now = time.time() if now is None else now
+        horizon = now + self.lead_seconds
+        due = []
+        while self._heap and self._heap[0][0] <= horizon:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue
+            key = entry[2]
+            _, _, reminder = self._entries.pop(key)
+            self._by_session.get(key[0], {}).get(key[1], set()).discard(key)
+            self._reminded.setdefault(key[0], set()).add((key, entry[0]))
+            due.append({
+                **reminder,
+                "due_at": entry[0],
+                "due_in_seconds": max(0, int(entry[0] - now))
+            })
+        return due
+
+    def metrics(self) -> Dict[str, Any]:
+        """Report the queue's size."""
+        return {
+            "scheduled_items": len(self._entries),
+            "scheduled_sessions": sum(
+                1 for goals in self._by_session.values() if any(goals.values())
+            ),
+            "heap_entries": len(self._heap)
+        }
@@ -0,0 +1,340 @@
+"""
+Event Log Session Service
+
+This module provides a durable session service that records every session
+mutation as an append-only log.
+
+Each session has a directory under EVENT_LOG_DIR holding:
+    log.jsonl     - one JSON record per line: a "create" record with the
+                    initial state, then one "event" record per appended event
+    snapshot.json - the compacted session as of some log offset: the
+                    materialized state, the most recent EVENT_LOG_SNAPSHOT_EVENTS
+                    events, the absolute position of the first of them and
+                    the byte offset of the log it covers
+
+Appending an event is a single sequential write. Every
+EVENT_LOG_SNAPSHOT_INTERVAL events a new snapshot is written, so loading a
+session after a restart reads one snapshot and replays at most that many
+log records, however old the session is. Events older than the snapshot's
+window stay in the log and are returned by list_events. A reloaded session
+therefore has fewer events; its event offset (see state_sync) records how
+many were left out, so state versions stay absolute and clients holding a
+version older than the loaded events get a full state resync.
+
+A record torn by a crash is ignored on load and cut from the end of the log
+before the next append; reads never modify the log. Sessions are cached by
+the process that loaded them, so a given session should be served by one
+process at a time.
+
+Session keys name directories, so app names, user ids and session ids that
+are empty, ".", ".." or contain a path separator are rejected.
+"""
+
+import copy
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListEventsResponse,
+    ListSessionsResponse
+)
+from .state_sync import get_event_offset, set_event_offset
+
+# Directory holding one subdirectory per session
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "session_logs")
+
+# Number of appended events between snapshots
+EVENT_LOG_SNAPSHOT_INTERVAL = int(os.getenv("EVENT_LOG_SNAPSHOT_INTERVAL", "50"))
+
+# Number of recent events kept in each snapshot
+EVENT_LOG_SNAPSHOT_EVENTS = int(os.getenv("EVENT_LOG_SNAPSHOT_EVENTS", "200"))
+
+LOG_FILE = "log.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+
+SessionKey = Tuple[str, str, str]
+
+class EventLogSessionService(BaseSessionService):
+    """A durable session service backed by per-session append-only logs and snapshots."""
+
+    def __init__(
+        self,
+        root: str = EVENT_LOG_DIR,
+        snapshot_interval: int = EVENT_LOG_SNAPSHOT_INTERVAL,
+        snapshot_events: int = EVENT_LOG_SNAPSHOT_EVENTS
+    ):
+        """
+        Args:
+            root: Directory holding the session logs
+            snapshot_interval: Number of appended events between snapshots
+            snapshot_events: Number of recent events kept in each snapshot
+        """
+        self.root = root
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_events = snapshot_events
+
+        # Sessions loaded or created by this process
+        self._sessions: Dict[SessionKey, Session] = {}
+
+        # Events appended to each cached session since its last snapshot
+        self._since_snapshot: Dict[SessionKey, int] = {}
+
+        # Logs with a torn final record: key -> length of the valid prefix
+        self._torn: Dict[SessionKey, int] = {}
+
+    # Files
+
+    def _dir(self, key: SessionKey) -> str:
+        """
+        Get the directory of a session.
+
+        Raises:
+            ValueError: If a part of the key could name a path outside the root
+        """
+        for part in key:
+            if (
+                not part
+                or part in (".", "..")
+                or "/" in part
+                or "\\" in part
+                or "\0" in part
+                or os.path.isabs(part)
+            ):
+                raise ValueError(f"Invalid session key: {part!r}")
+        return os.path.join(self.root, *key)
+
+    def _append_record(self, key: SessionKey, record: Dict[str, Any]) -> None:
+        """Append one record to a session's log, first cutting any torn tail."""
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        log_path = os.path.join(self._dir(key), LOG_FILE)
+        valid_length = self._torn.pop(key, None)
+        if valid_length is not None:
+            with open(log_path, "rb+") as f:
+                f.truncate(valid_length)
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.write("\n")
+
+    def _write_snapshot(self, key: SessionKey, session: Session) -> None:
+        """Write a snapshot covering the whole log so far."""
+        directory = self._dir(key)
+        events = session.events[-self.snapshot_events:]
+        snapshot = {
+            "state": session.state,
+            "last_update_time": session.last_update_time,
+            "offset": os.path.getsize(os.path.join(directory, LOG_FILE)),
+            "event_offset": get_event_offset(session) + len(session.events) - len(events),
+            "events": [
+                event.model_dump(mode="json", exclude_none=True)
+                for event in events
+            ]
+        }
+        path = os.path.join(directory, SNAPSHOT_FILE)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"), default=str)
+        os.replace(temp_path, path)
+        self._since_snapshot[key] = 0
+
+    def _replay(self, key: SessionKey, session: Session, log_path: str, offset: int) -> int:
+        """
+        Apply the log records after an offset to a session.
+
+        Returns:
+            The number of event records replayed
+        """
+        replayed = 0
+        with open(log_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final record; cut it before the next append so
+                    # later records stay parseable
+                    self._torn[key] = offset
+                    break
+                offset += len(line)
+                if record["type"] == "create":
+                    session.state = record["state"]
+                    session.last_update_time = record["time"]
+                elif record["type"] == "event":
+                    event = Event.model_validate(record["event"])
+                    super().append_event(session=session, event=event)
+                    session.last_update_time = event.timestamp
+                    replayed += 1
+        return replayed
+
+    # Reads
+
+    def _copy(self, session: Session, config: Optional[GetSessionConfig] = None) -> Session:
+        """Copy a cached session for a caller; events are shared, state is not."""
+        events = session.events
+        if config:
+            if config.num_recent_events:
+                events = events[-config.num_recent_events:]
+            elif config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+        result = Session(
+            id=session.id,
+            app_name=session.app_name,
+            user_id=session.user_id,
+            state=copy.deepcopy(session.state),
+            events=list(events),
+            last_update_time=session.last_update_time
+        )
+        set_event_offset(result, get_event_offset(session) + len(session.events) - len(events))
+        return result
+
+    def _load(self, key: SessionKey) -> Optional[Session]:
+        """Rebuild a session from its latest snapshot and the log tail."""
+        directory = self._dir(key)
+        log_path = os.path.join(directory, LOG_FILE)
+        if not os.path.exists(log_path):
+            return None
+
+        app_name, user_id, session_id = key
+        session = Session(id=session_id, app_name=app_name, user_id=user_id)
+        offset = 0
+        snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            session.state = snapshot["state"]
+            session.last_update_time = snapshot["last_update_time"]
+            session.events = [Event.model_validate(e) for e in snapshot["events"]]
+            set_event_offset(session, snapshot.get("event_offset", 0))
+            offset = snapshot["offset"]
+
+        self._since_snapshot[key] = self._replay(key, session, log_path, offset)
+        self._sessions[key] = session
+        return session
+
+    def _cached(self, key: SessionKey) -> Optional[Session]:
+        """Get a session from the cache, loading it if needed."""
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._load(key)
+        return session
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None
+    ) -> Optional[Session]:
+        session = self._cached((app_name, user_id, session_id))
+        if session is None:
+            return None
+        return self._copy(session, config)
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        directory = os.path.join(self.root, app_name, user_id)
+        if not os.path.isdir(directory):
+            return ListSessionsResponse()
+        sessions = []
+        for session_id in sorted(os.listdir(directory)):
+            log_path = os.path.join(directory, session_id, LOG_FILE)
+            if os.path.exists(log_path):
+                sessions.append(Session(
+                    id=session_id,
+                    app_name=app_name,
+                    user_id=user_id,
+                    last_update_time=os.path.getmtime(log_path)
+                ))
+        return ListSessionsResponse(sessions=sessions)
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        log_path = os.path.join(self._dir((app_name, user_id, session_id)), LOG_FILE)
+        if not os.path.exists(log_path):
+            return ListEventsResponse()
+        events: List[Event] = []
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record["type"] == "event":
+                    events.append(Event.model_validate(record["event"]))
+        return ListEventsResponse(events=events)
+
+    # Writes
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        key = (app_name, user_id, session_id)
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=copy.deepcopy(state or {}),
+            last_update_time=time.time()
+        )
+
+        # Re-creating a session replaces it, as the in-memory service does
+        self._delete(key)
+        os.makedirs(self._dir(key), exist_ok=True)
+        self._append_record(key, {
+            "type": "create",
+            "time": session.last_update_time,
+            "state": session.state
+        })
+        self._sessions[key] = session
+        self._since_snapshot[key] = 0
+        return self._copy(session)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        stored = self._cached(key)
+        if stored is None:
+            return event
+        if stored is not session:
+            super().append_event(session=stored, event=event)
+        stored.last_update_time = event.timestamp
+
+        self._append_record(key, {
+            "type": "event",
+            "event": event.model_dump(mode="json", exclude_none=True)
+        })
+        self._since_snapshot[key] = self._since_snapshot.get(key, 0) + 1
+        if self._since_snapshot[key] >= self.snapshot_interval:
+            self._write_snapshot(key, stored)
+        return event
+
+    def _delete(self, key: SessionKey) -> None:
+        """Drop a session from the cache and remove its files."""
+        self._sessions.pop(key, None)
+        self._since_snapshot.pop(key, None)
+        self._torn.pop(key, None)
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._delete((app_name, user_id, session_id))
@@ -0,0 +1,375 @@
+"""
+Goal Store
+
+This module keeps a student's goals so that adding or updating a goal writes
+only that goal, and querying goals never rescans them all.
+
+Each goal is its own top-level state key, "goal:<id>", with integer ids
+assigned in order. Next to them, "goal_index" holds:
+    next_id   - the id of the next goal
+    counts    - field -> value -> number of goals
+    revision  - a token that changes with every write
+
+State deltas are per top-level key, so adding a goal commits that goal and
+the small index rather than every goal. The lookups that span all goals (goal
+ids by type, status and priority, and a min-heap of [deadline, goal id] for
+goals whose deadline parses as a date) are not stored. Each process builds
+them on first use and keeps them in a bounded cache keyed by revision,
+updating them as goals are written; a write that is discarded leaves the
+cached revision unmatched, so they are rebuilt.
+
+Sessions that still hold the older "goals" list are read as before and moved
+to per-goal keys by their next write.
+"""
+
+import heapq
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set
+
+GOAL_PREFIX = "goal:"
+INDEX_KEY = "goal_index"
+
+# The single list goals were kept in before they had a key each
+LEGACY_GOALS_KEY = "goals"
+
+INDEXED_FIELDS = ("type", "status", "priority")
+
+# Statuses of goals that still have a deadline ahead of them
+OPEN_STATUSES = ("pending", "in_progress")
+
+# Number of sessions whose goal lookups are cached by this process
+GOAL_LOOKUP_CACHE_SIZE = int(os.getenv("GOAL_LOOKUP_CACHE_SIZE", "256"))
+
+# Goal lookups by index revision, least recently used first
+_lookup_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+def goal_key(goal_id: int) -> str:
+    """Get the state key of a goal."""
+    return f"{GOAL_PREFIX}{goal_id}"
+
+def goal_id_of(key: str) -> Optional[int]:
+    """
+    Get the goal id a state key holds.
+
+    Args:
+        key: A top-level state key
+
+    Returns:
+        The goal id, or None if the key does not hold a goal
+    """
+    if not key.startswith(GOAL_PREFIX):
+        return None
+    try:
+        return int(key[len(GOAL_PREFIX):])
+    except ValueError:
+        return None
+
+def changed_goal_ids(keys: Iterable[str]) -> Optional[Set[int]]:
+    """
+    Get the ids of the goals written under a set of changed state keys.
+
+    Args:
+        keys: Top-level state keys changed since some version
+
+    Returns:
+        The goal ids, or None if the older "goals" list changed, in which
+        case any goal may have
+    """
+    ids = set()
+    for key in keys:
+        if key == LEGACY_GOALS_KEY:
+            return None
+        goal_id = goal_id_of(key)
+        if goal_id is not None:
+            ids.add(goal_id)
+    return ids
+
+def normalize_deadline(deadline: Any) -> Optional[str]:
+    """
+    Get the sortable ISO form of a deadline.
+
+    Args:
+        deadline: The goal's deadline, such as "2026-12-01"
+
+    Returns:
+        The ISO date or datetime string, or None if it does not parse
+    """
+    if not isinstance(deadline, str):
+        return None
+    try:
+        return datetime.fromisoformat(deadline.strip()).isoformat()
+    except ValueError:
+        return None
+
+def iter_heap(heap: List[Any]) -> Iterator[Any]:
+    """
+    Iterate over a heap's entries in ascending order without modifying it.
+
+    Only entries that can come next are visited, so taking the first k costs
+    O(k log k) however large the heap is.
+
+    Args:
+        heap: A list ordered by heapq
+
+    Yields:
+        The heap's entries, smallest first
+    """
+    frontier = [(heap[0], 0)] if heap else []
+    while frontier:
+        entry, position = heapq.heappop(frontier)
+        yield entry
+        for child in (2 * position + 1, 2 * position + 2):
+            if child < len(heap):
+                heapq.heappush(frontier, (heap[child], child))
+
+def _has_goal_keys(index: Any) -> bool:
+    """Check whether an index belongs to goals stored under per-goal keys."""
+    return isinstance(index, dict) and "revision" in index
+
+def _legacy_goals(container: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Get the goals of an older "goals" list, with ids equal to their position."""
+    goals = container.get(LEGACY_GOALS_KEY)
+    if not isinstance(goals, list):
+        return []
+    return [
+        {**goal, "id": position}
+        for position, goal in enumerate(goals)
+        if isinstance(goal, dict)
+    ]
+
+def iter_goals(container: Mapping[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the goals in a state container, oldest first.
+
+    Args:
+        container: The session state, a transaction or a context dictionary
+
+    Yields:
+        The goal dicts
+    """
+    index = container.get(INDEX_KEY)
+    if not _has_goal_keys(index):
+        yield from _legacy_goals(container)
+        return
+    for goal_id in range(index["next_id"]):
+        goal = container.get(goal_key(goal_id))
+        if isinstance(goal, dict):
+            yield goal
+
+def _counted(counts: Dict[str, Dict[str, int]], goal: Dict[str, Any], step: int) -> Dict[str, Dict[str, int]]:
+    """Get new counts with a goal added (step 1) or removed (step -1)."""
+    counts = dict(counts)
+    for field in INDEXED_FIELDS:
+        value = str(goal.get(field))
+        by_value = dict(counts.get(field, {}))
+        by_value[value] = by_value.get(value, 0) + step
+        if by_value[value] <= 0:
+            by_value.pop(value)
+        counts[field] = by_value
+    return counts
+
+class GoalStore:
+    """Goals held in a state container, one key per goal."""
+
+    def __init__(self, container: Dict[str, Any]):
+        """
+        Args:
+            container: The state dict holding the goals and "goal_index";
+                written only when a goal is added or changed
+        """
+        self.container = container
+        index = container.get(INDEX_KEY)
+
+        # Goals of an older "goals" list, moved to their own keys on write
+        self._legacy: Optional[List[Dict[str, Any]]] = None
+        if not _has_goal_keys(index):
+            self._legacy = _legacy_goals(container)
+            counts = {field: {} for field in INDEXED_FIELDS}
+            for goal in self._legacy:
+                counts = _counted(counts, goal, 1)
+            index = {
+                "next_id": len(self._legacy),
+                "counts": counts,
+                "revision": uuid.uuid4().hex
+            }
+        self.index = index
+
+    def __len__(self) -> int:
+        return self.index["next_id"]
+
+    def _build_lookups(self) -> Dict[str, Any]:
+        """Build the field lookups and deadline heap from the goals."""
+        lookups = {
+            **{f"by_{field}": {} for field in INDEXED_FIELDS},
+            "deadlines": []
+        }
+        for goal in self:
+            self._add_lookups(lookups, goal)
+        heapq.heapify(lookups["deadlines"])
+        return lookups
+
+    def _lookups(self) -> Dict[str, Any]:
+        """Get the cached lookups of the current revision, building them if needed."""
+        revision = self.index["revision"]
+        lookups = _lookup_cache.get(revision)
+        if lookups is None:
+            lookups = self._build_lookups()
+            _lookup_cache[revision] = lookups
+            while len(_lookup_cache) > GOAL_LOOKUP_CACHE_SIZE:
+                _lookup_cache.popitem(last=False)
+        else:
+            _lookup_cache.move_to_end(revision)
+        return lookups
+
+    @staticmethod
+    def _add_lookups(lookups: Dict[str, Any], goal: Dict[str, Any]) -> None:
+        """Add a goal to the field lookups and deadline heap."""
+        for field in INDEXED_FIELDS:
+            lookups[f"by_{field}"].setdefault(str(goal.get(field)), set()).add(goal["id"])
+        deadline = normalize_deadline(goal.get("deadline"))
+        if deadline is not None:
+            heapq.heappush(lookups["deadlines"], (deadline, goal["id"]))
+
+    def _write(self, goal: Dict[str, Any], next_id: int, counts: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        """
+        Assign a goal and a new index revision to the container.
+
+        Returns:
+            The lookups, taken out of the cache under the old revision; the
+            caller updates them, and they are cached under the new one
+        """
+        lookups = self._lookups()
+        _lookup_cache.pop(self.index["revision"], None)
+
+        if self._legacy is not None:
+            for legacy_goal in self._legacy:
+                self.container[goal_key(legacy_goal["id"])] = legacy_goal
+            if LEGACY_GOALS_KEY in self.container:
+                self.container[LEGACY_GOALS_KEY] = []
+            self._legacy = None
+
+        self.container[goal_key(goal["id"])] = goal
+        self.index = {"next_id": next_id, "counts": counts, "revision": uuid.uuid4().hex}
+        self.container[INDEX_KEY] = self.index
+        _lookup_cache[self.index["revision"]] = lookups
+        return lookups
+
+    def add(self, goal: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add a goal in O(log n), writing only the goal and the index.
+
+        Args:
+            goal: The goal dict; an "id" is assigned
+
+        Returns:
+            The stored goal
+        """
+        goal["id"] = self.index["next_id"]
+        counts = _counted(self.index["counts"], goal, 1)
+        lookups = self._write(goal, goal["id"] + 1, counts)
+        self._add_lookups(lookups, goal)
+        return goal
+
+    def get(self, goal_id: int) -> Optional[Dict[str, Any]]:
+        """Get a goal by id."""
+        if not 0 <= goal_id < self.index["next_id"]:
+            return None
+        if self._legacy is not None:
+            return self._legacy[goal_id]
+        return self.container.get(goal_key(goal_id))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the goals, oldest first."""
+        if self._legacy is not None:
+            return iter(self._legacy)
+        return iter_goals(self.container)
+
+    def set_field(self, goal_id: int, field: str, value: Any) -> Dict[str, Any]:
+        """
+        Change an indexed field of a goal, writing only the goal and the index.
+
+        Args:
+            goal_id: The goal's id
+            field: One of INDEXED_FIELDS
+            value: The new value
+
+        Returns:
+            The updated goal
+
+        Raises:
+            KeyError: If the goal does not exist
+            ValueError: If the field is not indexed
+        """
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Not an indexed goal field: {field}")
+        goal = self.get(goal_id)
+        if goal is None:
+            raise KeyError(goal_id)
+
+        updated = {**goal, field: value}
+        counts = _counted(_counted(self.index["counts"], goal, -1), updated, 1)
+        lookups = self._write(updated, self.index["next_id"], counts)
+        by_value = lookups[f"by_{field}"]
+        old = str(goal.get(field))
+        by_value.get(old, set()).discard(goal_id)
+        if not by_value.get(old):
+            by_value.pop(old, None)
+        by_value.setdefault(str(value), set()).add(goal_id)
+        return updated
+
+    def count(self, field: str, value: Optional[Any] = None) -> Any:
+        """
+        Get goal counts in O(1).
+
+        Args:
+            field: One of INDEXED_FIELDS
+            value: A value of that field, or None for every value's count
+
+        Returns:
+            The number of goals with that value, or a dict of counts by value
+        """
+        counts = self.index["counts"].get(field, {})
+        if value is None:
+            return dict(counts)
+        return counts.get(str(value), 0)
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """
+        Get the goals with a value of an indexed field, in O(m log m) for m matches.
+
+        Args:
+            field: One of INDEXED_FIELDS
+            value: The value to match
+
+        Returns:
+            The matching goals, oldest first
+        """
+        ids = self._lookups()[f"by_{field}"].get(str(value), ())
+        return [self.get(goal_id) for goal_id in sorted(ids)]
+
+    def upcoming(self, limit: int = 5, statuses: Iterable[str] = OPEN_STATUSES) -> List[Dict[str, Any]]:
+        """
+        Get the goals with the nearest deadlines.
+
+        The deadline heap is walked with iter_heap: O(k log k) for k visited
+        entries. Goals in other statuses are skipped without being removed.
+
+        Args:
+            limit: Maximum number of goals to return
+            statuses: Statuses of the goals to include
+
+        Returns:
+            The goals, nearest deadline first
+        """
+        statuses = set(statuses)
+        result = []
+        for _, goal_id in iter_heap(self._lookups()["deadlines"]):
+            if len(result) >= limit:
+                break
+            goal = self.get(goal_id)
+            if goal is not None and goal.get("status") in statuses:
+                result.append(goal)
+        return result
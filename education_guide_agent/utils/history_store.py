@@ -0,0 +1,197 @@
+"""
+Interaction History Store
+
+This module keeps interaction history bounded in session state.
+
+Only the most recent HISTORY_HOT_LIMIT entries stay in the state's
+"interaction_history" list. When it grows past that, the oldest
+HISTORY_SEGMENT_SIZE entries are written to an append-only, gzip-compressed
+segment file under HISTORY_DIR and dropped from state. The state keeps a
+small "interaction_history_index" that records each segment's file, starting
+offset and entry count, so any page of the full history can be read by
+opening only the segments it overlaps.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import uuid
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Number of recent entries kept in session state
+HISTORY_HOT_LIMIT = int(os.getenv("HISTORY_HOT_LIMIT", "100"))
+
+# Number of entries written to each spilled segment
+HISTORY_SEGMENT_SIZE = int(os.getenv("HISTORY_SEGMENT_SIZE", "50"))
+
+# Directory holding spilled segments, one subdirectory per history log
+HISTORY_DIR = os.getenv("HISTORY_DIR", "interaction_history")
+
+HISTORY_KEY = "interaction_history"
+INDEX_KEY = "interaction_history_index"
+
+def _new_index() -> Dict[str, Any]:
+    """Create the index for a history that has not spilled yet."""
+    return {"log_id": uuid.uuid4().hex, "spilled": 0, "segments": []}
+
+def _segment_path(log_id: str, name: str) -> str:
+    """Get the path of a segment file."""
+    return os.path.join(HISTORY_DIR, log_id, name)
+
+def _write_segment(log_id: str, name: str, entries: List[Dict[str, Any]]) -> None:
+    """Write a segment file atomically."""
+    path = _segment_path(log_id, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, default=str))
+            f.write("\n")
+    os.replace(temp_path, path)
+
+def _remove_segment(log_id: str, name: str) -> None:
+    """Delete a segment file, if it exists."""
+    try:
+        os.remove(_segment_path(log_id, name))
+    except FileNotFoundError:
+        pass
+
+def _read_segment(log_id: str, name: str) -> List[Dict[str, Any]]:
+    """Read all entries of a segment file."""
+    with gzip.open(_segment_path(log_id, name), "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(
+    container: Dict[str, Any],
+    entry: Dict[str, Any],
+    on_rollback: Optional[Callable[[Callable[[], None]], None]] = None
+) -> List[str]:
+    """
+    Append an entry to the history held in a state container.
+
+    The container's keys are reassigned to new values; the history list and
+    index it held are not modified, so a staged write can be discarded. The
+    copies are bounded by HISTORY_HOT_LIMIT entries. A segment spilled for a
+    staged write is written straight away; pass the transaction's
+    on_rollback so the file is deleted if the write is discarded.
+
+    Args:
+        container: The dict holding "interaction_history" (the session state
+            or its "session_data" section)
+        entry: The history entry to append
+        on_rollback: Registers an undo step with the transaction staging the
+            write, if any
+
+    Returns:
+        The keys of the container that changed
+    """
+    history = container.get(HISTORY_KEY)
+    history = [*history, entry] if isinstance(history, list) else [entry]
+
+    changed = [HISTORY_KEY]
+    if len(history) > HISTORY_HOT_LIMIT:
+        spill_count = max(1, min(HISTORY_SEGMENT_SIZE, len(history) - 1))
+        index = container.get(INDEX_KEY) or _new_index()
+        name = f"{len(index['segments']):06d}.jsonl.gz"
+        _write_segment(index["log_id"], name, history[:spill_count])
+        if on_rollback is not None:
+            log_id = index["log_id"]
+            on_rollback(lambda: _remove_segment(log_id, name))
+        container[INDEX_KEY] = {
+            **index,
+            "spilled": index["spilled"] + spill_count,
+            "segments": [*index["segments"], {
+                "file": name,
+                "start": index["spilled"],
+                "count": spill_count
+            }]
+        }
+        history = history[spill_count:]
+        changed.append(INDEX_KEY)
+    container[HISTORY_KEY] = history
+    return changed
+
+def history_length(container: Dict[str, Any]) -> int:
+    """Get the total number of entries, spilled and in state."""
+    index = container.get(INDEX_KEY) or {}
+    return index.get("spilled", 0) + len(container.get(HISTORY_KEY) or [])
+
+def read_history(container: Dict[str, Any], offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+    """
+    Read a page of the full history, oldest entry first.
+
+    Args:
+        container: The dict holding "interaction_history"
+        offset: Position of the first entry to return (0 is the oldest)
+        limit: Maximum number of entries to return
+
+    Returns:
+        Dict with the entries, the total entry count, offset and limit
+    """
+    index = container.get(INDEX_KEY) or {}
+    segments = index.get("segments", [])
+    spilled = index.get("spilled", 0)
+    hot = container.get(HISTORY_KEY) or []
+    total = spilled + len(hot)
+
+    offset = max(0, offset)
+    limit = max(0, limit)
+    end = min(total, offset + limit)
+    entries = []
+
+    if offset < spilled:
+        # Locate the first segment overlapping the page
+        starts = [segment["start"] for segment in segments]
+        position = max(0, bisect.bisect_right(starts, offset) - 1)
+        while position < len(segments) and offset + len(entries) < min(end, spilled):
+            segment = segments[position]
+            segment_entries = _read_segment(index["log_id"], segment["file"])
+            first = offset + len(entries) - segment["start"]
+            last = min(end, spilled) - segment["start"]
+            entries.extend(segment_entries[first:last])
+            position += 1
+
+    if end > spilled:
+        entries.extend(hot[max(0, offset - spilled):end - spilled])
+
+    return {
+        "entries": entries,
+        "total": total,
+        "offset": offset,
+        "limit": limit
+    }
+
+def export_segments(container: Dict[str, Any]) -> List[Tuple[str, bytes]]:
+    """
+    Read the spilled segment files of a history as stored bytes.
+
+    Args:
+        container: The dict holding "interaction_history_index"
+
+    Returns:
+        List of (file name, compressed bytes) pairs, oldest segment first
+    """
+    index = container.get(INDEX_KEY) or {}
+    segments = []
+    for segment in index.get("segments", []):
+        with open(_segment_path(index["log_id"], segment["file"]), "rb") as f:
+            segments.append((segment["file"], f.read()))
+    return segments
+
+def import_segments(container: Dict[str, Any], segments: List[Tuple[str, bytes]]) -> None:
+    """
+    Write exported segment files for a history on this node.
+
+    Args:
+        container: The dict holding "interaction_history_index"
+        segments: The (file name, compressed bytes) pairs from export_segments
+    """
+    index = container.get(INDEX_KEY) or {}
+    for name, data in segments:
+        path = _segment_path(index["log_id"], os.path.basename(name))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
@@ -0,0 +1,185 @@
+"""
+Location Utilities
+
+This module provides helpers for coalescing streams of location fixes sent by
+the browser before they are stored in session state.
+"""
+
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+EARTH_RADIUS_METERS = 6371000.0
+
+# Location fixes closer than this distance and time to the previous stored fix
+# are dropped as duplicates
+LOCATION_DEDUP_METERS = float(os.getenv("LOCATION_DEDUP_METERS", "25"))
+LOCATION_DEDUP_SECONDS = float(os.getenv("LOCATION_DEDUP_SECONDS", "60"))
+
+# Maximum number of location fixes kept in a session's state
+LOCATION_RETENTION = int(os.getenv("LOCATION_RETENTION", "100"))
+
+# Key of the server receive time (seconds since the epoch) stamped on stored fixes
+RECEIVED_AT_KEY = "received_at"
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Get the great-circle distance between two coordinates.
+
+    Args:
+        lat1: Latitude of the first point in degrees
+        lon1: Longitude of the first point in degrees
+        lat2: Latitude of the second point in degrees
+        lon2: Longitude of the second point in degrees
+
+    Returns:
+        Distance in meters
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+def get_coordinates(fix: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    Get the coordinates of a fix.
+
+    Accepts both flat fixes and the browser's {"coords": {...}} shape.
+
+    Args:
+        fix: The location fix
+
+    Returns:
+        A (latitude, longitude) tuple, or None if the fix has no coordinates
+    """
+    source = fix.get("coords", fix)
+    try:
+        return float(source["latitude"]), float(source["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def get_fix_time(fix: Dict[str, Any], default: float) -> float:
+    """
+    Get the time of a fix in seconds since the epoch.
+
+    Browser geolocation timestamps are in milliseconds; ISO strings are also
+    accepted. A fix without a usable timestamp falls back to the time the
+    server received it, if stamped.
+
+    Args:
+        fix: The location fix
+        default: Time to use when the fix carries no usable timestamp or
+            receive time
+
+    Returns:
+        The fix time in seconds
+    """
+    value = fix.get("timestamp")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    received_at = fix.get(RECEIVED_AT_KEY)
+    if isinstance(received_at, (int, float)) and not isinstance(received_at, bool):
+        return float(received_at)
+    return default
+
+def coalesce_fixes(
+    fixes: List[Dict[str, Any]],
+    last_fix: Optional[Dict[str, Any]] = None,
+    min_distance_meters: float = 25.0,
+    min_interval_seconds: float = 60.0
+) -> List[Dict[str, Any]]:
+    """
+    Drop near-duplicate fixes from a batch.
+
+    A fix is dropped when it lies within min_distance_meters of the last kept
+    fix and was taken within min_interval_seconds of it. Fixes without
+    coordinates are dropped.
+
+    Args:
+        fixes: The incoming fixes, oldest first
+        last_fix: The most recently stored fix, if any
+        min_distance_meters: Distance under which fixes count as duplicates
+        min_interval_seconds: Time window within which fixes count as duplicates
+
+    Returns:
+        The fixes worth storing, oldest first
+    """
+    now = time.time()
+    kept = []
+    previous = None
+    if last_fix:
+        coordinates = get_coordinates(last_fix)
+        if coordinates:
+            previous = (coordinates, get_fix_time(last_fix, 0.0))
+
+    for fix in fixes:
+        coordinates = get_coordinates(fix)
+        if coordinates is None:
+            continue
+        fix_time = get_fix_time(fix, now)
+        if previous:
+            (prev_lat, prev_lon), prev_time = previous
+            distance = haversine_meters(prev_lat, prev_lon, *coordinates)
+            if (
+                distance < min_distance_meters
+                and abs(fix_time - prev_time) < min_interval_seconds
+            ):
+                continue
+        kept.append(fix)
+        previous = (coordinates, fix_time)
+    return kept
+
+def cap_locations(locations: List[Dict[str, Any]], retention: int) -> List[Dict[str, Any]]:
+    """
+    Keep only the most recent locations.
+
+    Args:
+        locations: Stored locations, oldest first
+        retention: Maximum number of locations to keep
+
+    Returns:
+        The retained locations, oldest first
+    """
+    if retention <= 0 or len(locations) <= retention:
+        return locations
+    return locations[-retention:]
+
+def add_fixes(
+    locations: List[Dict[str, Any]],
+    fixes: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Add fixes to a stored location list.
+
+    Near-duplicates of the last stored fix are dropped and the result is
+    capped at LOCATION_RETENTION entries. The stored list is not modified.
+
+    Args:
+        locations: Stored locations, oldest first
+        fixes: The incoming fixes, oldest first
+
+    Returns:
+        A tuple of the new location list and the fixes that were accepted;
+        the list is the one passed in when nothing was accepted
+    """
+    accepted = coalesce_fixes(
+        fixes,
+        last_fix=locations[-1] if locations else None,
+        min_distance_meters=LOCATION_DEDUP_METERS,
+        min_interval_seconds=LOCATION_DEDUP_SECONDS
+    )
+    if not accepted:
+        return locations, accepted
+    return cap_locations([*locations, *accepted], LOCATION_RETENTION), accepted
@@ -0,0 +1,64 @@
+"""
+Session Backend Utilities
+
+This module selects the session service used by the web app and the CLI.
+
+The backend is chosen with the SESSION_BACKEND environment variable:
+    memory   - in-process InMemorySessionService (default, single worker only)
+    bounded  - in-process BoundedSessionService, which hibernates idle and
+               least recently used sessions to disk to stay within a byte
+               budget (single worker only)
+    database - DatabaseSessionService at SESSION_DB_URL, shareable by several
+               worker processes
+    sqlite   - SqliteSessionService at SESSION_DB_PATH, a durable store with
+               per-key state rows and batched write-behind (single worker
+               only)
+    eventlog - EventLogSessionService under EVENT_LOG_DIR, an append-only log
+               per session with periodic snapshots for bounded recovery
+               (single worker only)
+"""
+
+import os
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+
+DEFAULT_DB_URL = "sqlite:///education_guide_sessions.db"
+DEFAULT_DB_PATH = "education_guide_sessions.sqlite"
+
+def create_session_service() -> BaseSessionService:
+    """
+    Create the session service selected by the environment.
+
+    Returns:
+        The configured session service
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+
+    if backend == "memory":
+        return InMemorySessionService()
+
+    if backend == "bounded":
+        from .bounded_session_service import BoundedSessionService
+
+        return BoundedSessionService()
+
+    if backend == "database":
+        from google.adk.sessions import DatabaseSessionService
+        from .sqlite_session_service import configure_sqlite_engine
+
+        db_url = os.getenv("SESSION_DB_URL", DEFAULT_DB_URL)
+        service = DatabaseSessionService(db_url=db_url)
+        if db_url.startswith("sqlite"):
+            configure_sqlite_engine(service.db_engine)
+        return service
+
+    if backend == "sqlite":
+        from .sqlite_session_service import SqliteSessionService
+
+        return SqliteSessionService(os.getenv("SESSION_DB_PATH", DEFAULT_DB_PATH))
+
+    if backend == "eventlog":
+        from .event_log_session_service import EventLogSessionService
+
+        return EventLogSessionService()
+
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
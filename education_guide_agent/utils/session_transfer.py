@@ -0,0 +1,382 @@
+"""
+Session Transfer Utilities
+
+This module exports a session to a compact binary snapshot and imports it on
+another node, so live sessions can be moved off a worker before it is drained.
+
+A snapshot is laid out as:
+    header   - magic b"EGSN", format version (u16), section count (u16)
+    table    - one entry per section: tag (4 bytes), codec (u8), 3 pad bytes,
+               payload offset (u64) and payload length (u64)
+    payloads - the section payloads, back to back
+
+Every section can be located from the table without reading the others, and
+a reader slices payloads out of the snapshot with memoryview, copying only
+what it decompresses. Sections:
+    META - JSON: app name, user id, session id, last update time and state
+           version (the event count)
+    STAT - JSON: the session state
+    EVNT - JSON: the session events
+    HSEG - one per spilled interaction history segment: a u16-prefixed JSON
+           header naming the state container and file, then the segment's
+           bytes as stored (already gzip-compressed, so never recompressed)
+JSON sections are compressed with zstd when it is installed, else zlib.
+
+Run from the repository root to migrate sessions of a durable backend
+(SESSION_BACKEND selects the backend, as for the web app):
+    python -m education_guide_agent.utils.session_transfer export snapshots/
+    python -m education_guide_agent.utils.session_transfer import snapshots/
+Stop every worker using the store before exporting with --delete. Running
+workers keep their own session caches and write-behind queues, and would
+write deleted sessions back to the store.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from .history_store import INDEX_KEY, export_segments, import_segments
+from .state_sync import get_event_offset, get_state_version, set_event_offset
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"EGSN"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHH")
+TABLE_ENTRY = struct.Struct("<4sBxxxQQ")
+SEGMENT_HEADER = struct.Struct("<H")
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+# State containers that may hold a spilled interaction history
+HISTORY_CONTAINERS = ("", "session_data")
+
+SNAPSHOT_SUFFIX = ".egsn"
+
+class SnapshotFormatError(ValueError):
+    """Raised when a blob is not a session snapshot this version can read."""
+
+def _compress(data: bytes) -> Tuple[int, bytes]:
+    """Compress a payload with the best available codec."""
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(data)
+    return CODEC_ZLIB, zlib.compress(data, 6)
+
+def _decompress(codec: int, payload: memoryview) -> bytes:
+    """Decompress a payload."""
+    if codec == CODEC_RAW:
+        return bytes(payload)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise SnapshotFormatError("Snapshot is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise SnapshotFormatError(f"Unknown codec: {codec}")
+
+def _dump_json(value: Any) -> bytes:
+    """Serialize a JSON section."""
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+def _history_container(state: Dict[str, Any], name: str) -> Dict[str, Any]:
+    """Get a state container that may hold a history by name."""
+    return state if name == "" else (state.get(name) or {})
+
+def export_session(session: Session) -> bytes:
+    """
+    Serialize a session to a binary snapshot.
+
+    Args:
+        session: The session to export, with all of its events
+
+    Returns:
+        The snapshot bytes
+
+    Raises:
+        ValueError: If the session was loaded without its earliest events,
+            which the snapshot could not restore
+    """
+    if get_event_offset(session):
+        raise ValueError(f"Session {session.id} is missing its earliest events")
+    sections: List[Tuple[bytes, int, bytes]] = []
+
+    def add_json(tag: bytes, value: Any) -> None:
+        codec, payload = _compress(_dump_json(value))
+        sections.append((tag, codec, payload))
+
+    add_json(b"META", {
+        "app_name": session.app_name,
+        "user_id": session.user_id,
+        "id": session.id,
+        "last_update_time": session.last_update_time,
+        "version": get_state_version(session)
+    })
+    add_json(b"STAT", session.state)
+    add_json(b"EVNT", [
+        event.model_dump(mode="json", exclude_none=True) for event in session.events
+    ])
+    for container in HISTORY_CONTAINERS:
+        for name, data in export_segments(_history_container(session.state, container)):
+            header = _dump_json({"container": container, "file": name})
+            sections.append((
+                b"HSEG",
+                CODEC_RAW,
+                SEGMENT_HEADER.pack(len(header)) + header + data
+            ))
+
+    offset = HEADER.size + TABLE_ENTRY.size * len(sections)
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(sections))]
+    for tag, codec, payload in sections:
+        parts.append(TABLE_ENTRY.pack(tag, codec, offset, len(payload)))
+        offset += len(payload)
+    parts.extend(payload for _, _, payload in sections)
+    return b"".join(parts)
+
+def _decode_section(decoded: Dict[str, Any], tag: bytes, codec: int, payload: memoryview) -> None:
+    """Decode one section into the result of read_snapshot."""
+    if tag == b"HSEG":
+        (header_length,) = SEGMENT_HEADER.unpack_from(payload, 0)
+        start = SEGMENT_HEADER.size
+        header = json.loads(bytes(payload[start:start + header_length]))
+        decoded["segments"].append((
+            header["container"],
+            header["file"],
+            bytes(payload[start + header_length:])
+        ))
+    elif tag == b"META":
+        decoded["meta"] = json.loads(_decompress(codec, payload))
+    elif tag == b"STAT":
+        decoded["state"] = json.loads(_decompress(codec, payload))
+    elif tag == b"EVNT":
+        decoded["events"] = json.loads(_decompress(codec, payload))
+    # Unknown sections come from newer writers and are skipped
+
+def read_snapshot(blob: bytes) -> Dict[str, Any]:
+    """
+    Decode a binary snapshot.
+
+    Args:
+        blob: The snapshot bytes
+
+    Returns:
+        Dict with "meta", "state", "events" and "segments"; segments is a
+        list of (container, file name, bytes) triples
+
+    Raises:
+        SnapshotFormatError: If the blob is not a readable snapshot
+    """
+    view = memoryview(blob)
+    if len(view) < HEADER.size:
+        raise SnapshotFormatError("Snapshot is truncated")
+    magic, version, count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise SnapshotFormatError("Not a session snapshot")
+    if version > FORMAT_VERSION:
+        raise SnapshotFormatError(f"Unsupported snapshot version: {version}")
+    if HEADER.size + TABLE_ENTRY.size * count > len(view):
+        raise SnapshotFormatError("Snapshot is truncated")
+
+    decoded = {"meta": None, "state": None, "events": None, "segments": []}
+    for position in range(count):
+        tag, codec, offset, length = TABLE_ENTRY.unpack_from(
+            view, HEADER.size + TABLE_ENTRY.size * position
+        )
+        if offset + length > len(view):
+            raise SnapshotFormatError("Snapshot is truncated")
+        payload = view[offset:offset + length]
+        try:
+            _decode_section(decoded, tag, codec, payload)
+        except SnapshotFormatError:
+            raise
+        except (ValueError, KeyError, struct.error, zlib.error) as e:
+            raise SnapshotFormatError(f"Snapshot section {tag!r} is corrupt: {e}") from None
+
+    if decoded["meta"] is None or decoded["state"] is None or decoded["events"] is None:
+        raise SnapshotFormatError("Snapshot is missing a required section")
+    return decoded
+
+def import_session(
+    session_service: BaseSessionService,
+    blob: bytes,
+    replace: bool = False
+) -> Session:
+    """
+    Restore a session from a binary snapshot.
+
+    The session is created with its exported state and its events are
+    appended in order, so it keeps its id and state version. Spilled
+    history segments are written to this node's history directory.
+
+    Args:
+        session_service: The session service to restore into
+        blob: The snapshot bytes
+        replace: Whether to replace an existing session with the same id
+
+    Returns:
+        The restored session
+
+    Raises:
+        SnapshotFormatError: If the blob is not a readable snapshot
+        ValueError: If the session exists and replace is False, or the
+            restored session does not match the snapshot
+    """
+    snapshot = read_snapshot(blob)
+    meta = snapshot["meta"]
+    state = snapshot["state"]
+    key = {
+        "app_name": meta["app_name"],
+        "user_id": meta["user_id"],
+        "session_id": meta["id"]
+    }
+
+    if session_service.get_session(**key) is not None:
+        if not replace:
+            raise ValueError(f"Session {meta['id']} already exists")
+        session_service.delete_session(**key)
+
+    for container, name, data in snapshot["segments"]:
+        target = _history_container(state, container)
+        if INDEX_KEY in target:
+            import_segments(target, [(name, data)])
+
+    session = session_service.create_session(
+        app_name=meta["app_name"],
+        user_id=meta["user_id"],
+        state=state,
+        session_id=meta["id"]
+    )
+    # Events re-apply their deltas in order, which ends at the exported state
+    for event_data in snapshot["events"]:
+        session_service.append_event(session, Event.model_validate(event_data))
+
+    restored = session_service.get_session(**key)
+    if restored is None or get_state_version(restored) != meta["version"]:
+        raise ValueError(f"Session {meta['id']} did not restore to version {meta['version']}")
+    return restored
+
+def _export_all(
+    session_service: BaseSessionService,
+    app_name: str,
+    user_id: str,
+    directory: str,
+    session_ids: List[str],
+    delete: bool
+) -> int:
+    """Export sessions to files in a directory."""
+    os.makedirs(directory, exist_ok=True)
+    if not session_ids:
+        listed = session_service.list_sessions(app_name=app_name, user_id=user_id)
+        session_ids = [session.id for session in listed.sessions]
+
+    exported = 0
+    for session_id in session_ids:
+        session = session_service.get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id
+        )
+        if session is None:
+            print(f"Skipping unknown session: {session_id}", file=sys.stderr)
+            continue
+        if get_event_offset(session):
+            # The backend loaded only recent events; export the full list
+            session = session.model_copy(update={
+                "events": session_service.list_events(
+                    app_name=app_name,
+                    user_id=user_id,
+                    session_id=session_id
+                ).events
+            })
+            set_event_offset(session, 0)
+        path = os.path.join(directory, f"{session_id}{SNAPSHOT_SUFFIX}")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(export_session(session))
+        os.replace(temp_path, path)
+        if delete:
+            session_service.delete_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
+        exported += 1
+    return exported
+
+def _import_all(session_service: BaseSessionService, paths: List[str], replace: bool) -> int:
+    """Import snapshot files and directories of snapshot files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith(SNAPSHOT_SUFFIX)
+            )
+        else:
+            files.append(path)
+
+    imported = 0
+    for path in files:
+        with open(path, "rb") as f:
+            blob = f.read()
+        try:
+            import_session(session_service, blob, replace=replace)
+            imported += 1
+        except ValueError as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+    return imported
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Export or import sessions of the configured session backend."""
+    from .session_backends import create_session_service
+
+    parser = argparse.ArgumentParser(description="Move sessions between nodes as binary snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write sessions to snapshot files")
+    export_parser.add_argument("directory", help="directory to write snapshots to")
+    export_parser.add_argument("session_ids", nargs="*", help="sessions to export (default: all)")
+    export_parser.add_argument("--app-name", default="education_guide")
+    export_parser.add_argument("--user-id", default="user")
+    export_parser.add_argument("--delete", action="store_true", help="delete each session once exported; stop all workers using the store first")
+
+    import_parser = commands.add_parser("import", help="restore sessions from snapshot files")
+    import_parser.add_argument("paths", nargs="+", help="snapshot files or directories")
+    import_parser.add_argument("--replace", action="store_true", help="replace existing sessions")
+
+    args = parser.parse_args(argv)
+    session_service = create_session_service()
+    try:
+        if args.command == "export":
+            count = _export_all(
+                session_service,
+                args.app_name,
+                args.user_id,
+                args.directory,
+                args.session_ids,
+                args.delete
+            )
+            print(f"Exported {count} session(s) to {args.directory}")
+        else:
+            count = _import_all(session_service, args.paths, args.replace)
+            print(f"Imported {count} session(s)")
+    finally:
+        close = getattr(session_service, "close", None)
+        if close is not None:
+            close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
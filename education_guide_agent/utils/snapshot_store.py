@@ -0,0 +1,84 @@
+"""
+Profile Snapshot Store
+
+This module stores copies of profile data once per distinct content.
+
+Each snapshot is keyed by a hash of its canonical JSON form and kept in the
+"profile_snapshots" map next to the interaction history. History entries hold
+only the keys, so logging the same profile many times costs one copy.
+"""
+
+import copy
+import hashlib
+import json
+from typing import Dict, Any, Optional
+
+SNAPSHOTS_KEY = "profile_snapshots"
+REF_PREFIX = "sha256:"
+
+def snapshot_ref(data: Any) -> str:
+    """
+    Get the content-addressed key of a value.
+
+    Args:
+        data: A JSON-serializable value
+
+    Returns:
+        The snapshot key, e.g. "sha256:3f2a..."
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return REF_PREFIX + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+def store_snapshot(container: Dict[str, Any], data: Any) -> str:
+    """
+    Store a snapshot of a value unless identical content is already stored.
+
+    The stored copy is detached from the live data, so later edits to the
+    profile do not change past snapshots.
+
+    Args:
+        container: The dict holding the snapshot map; a new snapshot map is
+            assigned to it when a snapshot is added
+        data: The value to snapshot
+
+    Returns:
+        The snapshot key
+    """
+    ref = snapshot_ref(data)
+    snapshots = container.get(SNAPSHOTS_KEY) or {}
+    if ref not in snapshots:
+        container[SNAPSHOTS_KEY] = {**snapshots, ref: copy.deepcopy(data)}
+    return ref
+
+def resolve_snapshot(container: Dict[str, Any], ref: str) -> Optional[Any]:
+    """
+    Get the value stored under a snapshot key.
+
+    Args:
+        container: The dict holding the snapshot map
+        ref: The snapshot key
+
+    Returns:
+        The stored value, or None if it is unknown
+    """
+    return (container.get(SNAPSHOTS_KEY) or {}).get(ref)
+
+def resolve_entry(container: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Expand the snapshot references of a history entry.
+
+    Args:
+        container: The dict holding the snapshot map
+        entry: A history entry whose data may contain a "snapshots" map
+
+    Returns:
+        A copy of the entry with each reference replaced by its value
+    """
+    data = entry.get("data")
+    if not isinstance(data, dict) or not isinstance(data.get("snapshots"), dict):
+        return entry
+    expanded = {
+        name: resolve_snapshot(container, ref)
+        for name, ref in data["snapshots"].items()
+    }
+    return {**entry, "data": {**data, "snapshots": expanded}}
@@ -0,0 +1,497 @@
+"""
+SQLite Session Service
+
+This module provides a durable session service backed by a local SQLite file.
+
+State is stored as one row per top-level key, so committing an event only
+writes the keys named in its state delta. Writes are queued and flushed in
+batches by a background thread (write-behind); reads are served from the
+process's copy of each session. At most WRITE_BEHIND_INTERVAL seconds of
+writes are lost if the process is killed; close() and interpreter exit flush
+everything that is pending.
+
+Sessions are cached by the process that loaded them, and nothing tells a
+process when another one writes, so the store must be served by a single
+worker. The cache keeps at most SQLITE_SESSION_CACHE_SIZE sessions; the least
+recently used ones without queued writes are dropped and reloaded on demand.
+"""
+
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListEventsResponse,
+    ListSessionsResponse
+)
+from sqlalchemy import (
+    Column,
+    Float,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    event as sqlalchemy_event,
+    select
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Seconds between background flushes of queued writes
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "0.5"))
+
+# Number of queued writes that triggers an early flush
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+
+# How long a SQLite connection waits for another writer's lock (ms)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Number of sessions kept in the process's cache
+SQLITE_SESSION_CACHE_SIZE = int(os.getenv("SQLITE_SESSION_CACHE_SIZE", "1000"))
+
+SessionKey = Tuple[str, str, str]
+
+metadata = MetaData()
+
+sessions_table = Table(
+    "sessions",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("id", String(128), primary_key=True),
+    Column("update_time", Float, nullable=False)
+)
+
+state_table = Table(
+    "session_state",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("session_id", String(128), primary_key=True),
+    Column("key", String(256), primary_key=True),
+    Column("value", Text, nullable=False)
+)
+
+events_table = Table(
+    "session_events",
+    metadata,
+    Column("app_name", String(128), primary_key=True),
+    Column("user_id", String(128), primary_key=True),
+    Column("session_id", String(128), primary_key=True),
+    Column("id", String(128), primary_key=True),
+    Column("timestamp", Float, nullable=False, index=True),
+    Column("data", Text, nullable=False)
+)
+
+def configure_sqlite_engine(engine) -> None:
+    """
+    Prepare a SQLite engine for concurrent use.
+
+    WAL mode lets readers proceed while another connection writes, and the
+    busy timeout makes writers wait for the lock instead of failing at once.
+
+    Args:
+        engine: The SQLAlchemy engine to configure
+    """
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    sqlalchemy_event.listen(engine, "connect", _set_pragmas)
+
+    # Connections opened before the listener was added miss the settings
+    engine.dispose()
+
+class SqliteSessionService(BaseSessionService):
+    """A durable session service with per-key state rows and write-behind."""
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = WRITE_BEHIND_INTERVAL,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        cache_size: int = SQLITE_SESSION_CACHE_SIZE
+    ):
+        """
+        Args:
+            path: Path of the SQLite database file
+            flush_interval: Seconds between background flushes
+            batch_size: Number of queued writes that triggers an early flush
+            cache_size: Number of sessions kept in the process's cache
+        """
+        self.engine = create_engine(f"sqlite:///{path}")
+        configure_sqlite_engine(self.engine)
+        metadata.create_all(self.engine)
+
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        # Sessions loaded or created by this process, least recently used first
+        self._sessions: "OrderedDict[SessionKey, Session]" = OrderedDict()
+
+        # Writes waiting for the next flush, coalesced per row
+        self._pending_sessions: Dict[SessionKey, float] = {}
+        self._pending_state: Dict[Tuple[SessionKey, str], Optional[str]] = {}
+        self._pending_events: List[Tuple[SessionKey, Event]] = []
+        self._pending_deletes: Set[SessionKey] = set()
+
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            name="sqlite-session-writer",
+            daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # Reads
+
+    def _copy(self, session: Session, config: Optional[GetSessionConfig] = None) -> Session:
+        """Copy a cached session for a caller; events are shared, state is not."""
+        events = session.events
+        if config:
+            if config.num_recent_events:
+                events = events[-config.num_recent_events:]
+            elif config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+        return Session(
+            id=session.id,
+            app_name=session.app_name,
+            user_id=session.user_id,
+            state=copy.deepcopy(session.state),
+            events=list(events),
+            last_update_time=session.last_update_time
+        )
+
+    def _load(self, key: SessionKey) -> Optional[Session]:
+        """Load a session from the database into the cache."""
+        app_name, user_id, session_id = key
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(sessions_table.c.update_time).where(
+                    sessions_table.c.app_name == app_name,
+                    sessions_table.c.user_id == user_id,
+                    sessions_table.c.id == session_id
+                )
+            ).first()
+            if row is None:
+                return None
+            state_rows = conn.execute(
+                select(state_table.c.key, state_table.c.value).where(
+                    state_table.c.app_name == app_name,
+                    state_table.c.user_id == user_id,
+                    state_table.c.session_id == session_id
+                )
+            ).all()
+            event_rows = conn.execute(
+                select(events_table.c.data).where(
+                    events_table.c.app_name == app_name,
+                    events_table.c.user_id == user_id,
+                    events_table.c.session_id == session_id
+                ).order_by(events_table.c.timestamp)
+            ).all()
+
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state={r.key: json.loads(r.value) for r in state_rows},
+            events=[Event.model_validate_json(r.data) for r in event_rows],
+            last_update_time=row.update_time
+        )
+        self._remember(key, session)
+        return session
+
+    def _remember(self, key: SessionKey, session: Session) -> None:
+        """Cache a session, dropping least recently used ones over the limit."""
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        self._trim()
+
+    def _trim(self) -> None:
+        """Drop least recently used sessions until the cache fits.
+
+        Sessions with queued writes stay until they are flushed, so a reload
+        never reads rows older than the cached copy.
+        """
+        excess = len(self._sessions) - self.cache_size
+        if excess <= 0:
+            return
+        for key in list(self._sessions):
+            if excess <= 0:
+                break
+            if key in self._pending_sessions:
+                continue
+            del self._sessions[key]
+            excess -= 1
+
+    def _cached(self, key: SessionKey) -> Optional[Session]:
+        """Get a session from the cache, loading it if needed."""
+        session = self._sessions.get(key)
+        if session is not None:
+            self._sessions.move_to_end(key)
+        elif key not in self._pending_deletes:
+            session = self._load(key)
+        return session
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None
+    ) -> Optional[Session]:
+        with self._lock:
+            session = self._cached((app_name, user_id, session_id))
+            if session is None:
+                return None
+            return self._copy(session, config)
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        self.flush()
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(sessions_table.c.id, sessions_table.c.update_time).where(
+                    sessions_table.c.app_name == app_name,
+                    sessions_table.c.user_id == user_id
+                )
+            ).all()
+        return ListSessionsResponse(sessions=[
+            Session(
+                id=row.id,
+                app_name=app_name,
+                user_id=user_id,
+                last_update_time=row.update_time
+            )
+            for row in rows
+        ])
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        with self._lock:
+            session = self._cached((app_name, user_id, session_id))
+            return ListEventsResponse(events=list(session.events) if session else [])
+
+    # Writes
+
+    def _queue_state(self, key: SessionKey, state_key: str, value: Any) -> None:
+        """Queue a write of one top-level state key."""
+        self._pending_state[(key, state_key)] = json.dumps(value)
+
+    def _maybe_flush_early(self) -> None:
+        """Wake the writer when enough writes are queued."""
+        queued = len(self._pending_state) + len(self._pending_events)
+        if queued >= self.batch_size:
+            self._wake.set()
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        key = (app_name, user_id, session_id)
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=copy.deepcopy(state or {}),
+            last_update_time=time.time()
+        )
+
+        with self._lock:
+            if key in self._sessions or self._load(key) is not None:
+                # Re-creating a session replaces it, as the in-memory service does
+                self._delete(key)
+            self._pending_sessions[key] = session.last_update_time
+            self._remember(key, session)
+            for state_key, value in session.state.items():
+                self._queue_state(key, state_key, value)
+            self._maybe_flush_early()
+            return self._copy(session)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            stored = self._cached(key)
+            if stored is None:
+                return event
+            if stored is not session:
+                super().append_event(session=stored, event=event)
+            stored.last_update_time = event.timestamp
+
+            self._pending_sessions[key] = event.timestamp
+            self._pending_events.append((key, event))
+            if event.actions and event.actions.state_delta:
+                for state_key in event.actions.state_delta:
+                    if state_key.startswith(State.TEMP_PREFIX):
+                        continue
+                    self._queue_state(key, state_key, stored.state.get(state_key))
+            self._maybe_flush_early()
+        return event
+
+    def _delete(self, key: SessionKey) -> None:
+        """Drop a session from the cache and queue its deletion."""
+        self._sessions.pop(key, None)
+        self._pending_sessions.pop(key, None)
+        self._pending_state = {
+            row: value for row, value in self._pending_state.items() if row[0] != key
+        }
+        self._pending_events = [item for item in self._pending_events if item[0] != key]
+        self._pending_deletes.add(key)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._delete((app_name, user_id, session_id))
+        self._wake.set()
+
+    # Write-behind
+
+    def flush(self) -> None:
+        """Write all queued changes to the database in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                deletes = self._pending_deletes
+                sessions = self._pending_sessions
+                state = self._pending_state
+                events = self._pending_events
+                self._pending_deletes = set()
+                self._pending_sessions = {}
+                self._pending_state = {}
+                self._pending_events = []
+
+            if not (deletes or sessions or state or events):
+                return
+
+            try:
+                self._write(deletes, sessions, state, events)
+            except Exception:
+                # Put the batch back in front of anything queued since
+                with self._lock:
+                    sessions.update(self._pending_sessions)
+                    state.update(self._pending_state)
+                    self._pending_deletes = deletes | self._pending_deletes
+                    self._pending_sessions = sessions
+                    self._pending_state = state
+                    self._pending_events = events + self._pending_events
+                raise
+
+            # Sessions that were kept for their queued writes can go now
+            with self._lock:
+                self._trim()
+
+    def _write(
+        self,
+        deletes: Set[SessionKey],
+        sessions: Dict[SessionKey, float],
+        state: Dict[Tuple[SessionKey, str], Optional[str]],
+        events: List[Tuple[SessionKey, Event]]
+    ) -> None:
+        """Apply one batch of queued changes in a single transaction."""
+        with self.engine.begin() as conn:
+            for app_name, user_id, session_id in deletes:
+                conn.execute(delete(sessions_table).where(
+                    sessions_table.c.app_name == app_name,
+                    sessions_table.c.user_id == user_id,
+                    sessions_table.c.id == session_id
+                ))
+                conn.execute(delete(state_table).where(
+                    state_table.c.app_name == app_name,
+                    state_table.c.user_id == user_id,
+                    state_table.c.session_id == session_id
+                ))
+                conn.execute(delete(events_table).where(
+                    events_table.c.app_name == app_name,
+                    events_table.c.user_id == user_id,
+                    events_table.c.session_id == session_id
+                ))
+
+            if sessions:
+                stmt = sqlite_insert(sessions_table)
+                conn.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["app_name", "user_id", "id"],
+                        set_={"update_time": stmt.excluded.update_time}
+                    ),
+                    [
+                        {"app_name": a, "user_id": u, "id": s, "update_time": t}
+                        for (a, u, s), t in sessions.items()
+                    ]
+                )
+
+            if state:
+                stmt = sqlite_insert(state_table)
+                conn.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["app_name", "user_id", "session_id", "key"],
+                        set_={"value": stmt.excluded.value}
+                    ),
+                    [
+                        {"app_name": a, "user_id": u, "session_id": s, "key": k, "value": v}
+                        for ((a, u, s), k), v in state.items()
+                    ]
+                )
+
+            if events:
+                conn.execute(
+                    sqlite_insert(events_table).on_conflict_do_nothing(),
+                    [
+                        {
+                            "app_name": a,
+                            "user_id": u,
+                            "session_id": s,
+                            "id": e.id,
+                            "timestamp": e.timestamp,
+                            "data": e.model_dump_json(exclude_none=True)
+                        }
+                        for (a, u, s), e in events
+                    ]
+                )
+
+    def _flush_loop(self) -> None:
+        """Background writer: flush queued changes periodically."""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing sessions: {e}")
+
+    def close(self) -> None:
+        """Flush pending writes and stop the background writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=max(1.0, self.flush_interval * 2))
+        self.flush()
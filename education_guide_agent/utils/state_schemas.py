@@ -0,0 +1,223 @@
+"""
+State Schemas
+
+This module validates data at the boundary where it enters session state.
+
+Every profile section, goal and location fix written by a tool or an HTTP
+endpoint is checked against a pydantic schema compiled once at import.
+Known fields are typed and coerced (a GPA of "3.8/4.0" becomes 3.8), strings
+and lists are capped, and each record is limited to STATE_SECTION_MAX_BYTES
+once serialized. Keys that the schemas do not name are kept, so tools can
+still record free-form details, but they count towards the size limit.
+Readers of validated data can rely on these types instead of re-checking.
+"""
+
+import json
+import os
+import re
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+
+from pydantic import (
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Field,
+    StringConstraints,
+    TypeAdapter,
+    ValidationError,
+    model_validator
+)
+
+# Longest string accepted in a known field
+STATE_MAX_STRING = int(os.getenv("STATE_MAX_STRING", "2000"))
+
+# Most items accepted in a known list field
+STATE_MAX_ITEMS = int(os.getenv("STATE_MAX_ITEMS", "100"))
+
+# Largest serialized size of one section, goal or location fix (bytes)
+STATE_SECTION_MAX_BYTES = int(os.getenv("STATE_SECTION_MAX_BYTES", "16384"))
+
+class StateValidationError(ValueError):
+    """Raised when data fails its schema at the state write boundary."""
+
+def _parse_gpa(value: Any) -> Any:
+    """Coerce GPA strings such as "3.8", "3,8" or "3.8/4.0" to a number."""
+    if isinstance(value, str):
+        match = re.match(r"\s*(\d+(?:[.,]\d+)?)", value)
+        if match:
+            return float(match.group(1).replace(",", "."))
+    return value
+
+def _lower(value: Any) -> Any:
+    """Lower-case and trim strings before matching them against choices."""
+    return value.strip().lower() if isinstance(value, str) else value
+
+Text = Annotated[str, StringConstraints(strip_whitespace=True, max_length=STATE_MAX_STRING)]
+Gpa = Annotated[float, BeforeValidator(_parse_gpa), Field(ge=0, le=100)]
+TextList = Annotated[List[Text], Field(max_length=STATE_MAX_ITEMS)]
+Priority = Annotated[Literal["high", "medium", "low"], BeforeValidator(_lower)]
+GoalStatus = Annotated[
+    Literal["pending", "in_progress", "completed", "cancelled"],
+    BeforeValidator(_lower)
+]
+
+class StateRecord(BaseModel):
+    """Base schema: unknown keys are kept and the whole record is size-capped."""
+
+    model_config = ConfigDict(extra="allow")
+
+    @model_validator(mode="after")
+    def _check_size(self) -> "StateRecord":
+        size = len(json.dumps(self.model_dump(exclude_unset=True), default=str))
+        if size > STATE_SECTION_MAX_BYTES:
+            raise ValueError(
+                f"record is {size} bytes, over the {STATE_SECTION_MAX_BYTES} byte limit"
+            )
+        return self
+
+class BackgroundSchema(StateRecord):
+    country: Optional[Text] = None
+    travel_experience: Optional[Union[bool, Text]] = None
+    education_challenges: Optional[Text] = None
+
+class AcademicSchema(StateRecord):
+    gpa: Optional[Gpa] = None
+    gpa_scale: Optional[Text] = None
+    school_type: Optional[Text] = None
+    field_of_study: Optional[Text] = None
+    english_proficiency: Optional[Text] = None
+    standardized_tests: Optional[Annotated[List[Any], Field(max_length=STATE_MAX_ITEMS)]] = None
+    test_scores: Optional[Dict[str, Any]] = None
+    academic_history: Optional[Dict[str, Any]] = None
+
+class UniversityPreferencesSchema(StateRecord):
+    target_universities: Optional[TextList] = None
+    field_of_study: Optional[Text] = None
+
+class FinancialConstraintsSchema(StateRecord):
+    budget: Optional[Union[float, Text]] = None
+    financial_needs: Optional[Dict[str, Any]] = None
+
+class ApplicationReadinessSchema(StateRecord):
+    recommenders_available: Optional[Annotated[int, Field(ge=0)]] = None
+
+class ExtracurricularsSchema(StateRecord):
+    activities: Optional[Annotated[List[Any], Field(max_length=STATE_MAX_ITEMS)]] = None
+    hobbies: Optional[TextList] = None
+    leadership_interest: Optional[bool] = None
+
+class AspirationsSchema(StateRecord):
+    dream_career: Optional[Text] = None
+
+class GoalSchema(StateRecord):
+    type: Text
+    description: Text
+    deadline: Text
+    priority: Priority
+    status: GoalStatus = "pending"
+    milestones: Annotated[List[Any], Field(max_length=STATE_MAX_ITEMS)] = []
+
+class CoordinatesSchema(StateRecord):
+    latitude: Annotated[float, Field(ge=-90, le=90)]
+    longitude: Annotated[float, Field(ge=-180, le=180)]
+    accuracy: Optional[Annotated[float, Field(ge=0)]] = None
+
+class LocationFixSchema(StateRecord):
+    latitude: Optional[Annotated[float, Field(ge=-90, le=90)]] = None
+    longitude: Optional[Annotated[float, Field(ge=-180, le=180)]] = None
+    accuracy: Optional[Annotated[float, Field(ge=0)]] = None
+    coords: Optional[CoordinatesSchema] = None
+    timestamp: Optional[Union[float, Text]] = None
+    name: Optional[Text] = None
+
+    @model_validator(mode="after")
+    def _check_coordinates(self) -> "LocationFixSchema":
+        has_flat = self.latitude is not None and self.longitude is not None
+        if not has_flat and self.coords is None:
+            raise ValueError("latitude and longitude (or coords) are required")
+        return self
+
+# Compiled validators, built once at import
+PROFILE_SECTION_ADAPTERS: Dict[str, TypeAdapter] = {
+    "background": TypeAdapter(BackgroundSchema),
+    "academic": TypeAdapter(AcademicSchema),
+    "university_preferences": TypeAdapter(UniversityPreferencesSchema),
+    "financial_constraints": TypeAdapter(FinancialConstraintsSchema),
+    "application_readiness": TypeAdapter(ApplicationReadinessSchema),
+    "extracurriculars": TypeAdapter(ExtracurricularsSchema),
+    "aspirations": TypeAdapter(AspirationsSchema)
+}
+GOAL_ADAPTER = TypeAdapter(GoalSchema)
+LOCATION_BATCH_ADAPTER = TypeAdapter(
+    Annotated[List[LocationFixSchema], Field(max_length=STATE_MAX_ITEMS * 10)]
+)
+
+def _describe(error: ValidationError, label: str) -> StateValidationError:
+    """Summarize a pydantic error in one line."""
+    problems = "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or label}: {item['msg']}"
+        for item in error.errors()
+    )
+    return StateValidationError(f"Invalid {label}: {problems}")
+
+def _dump(record: BaseModel) -> Dict[str, Any]:
+    """Get the stored form of a validated record, without fields it did not set."""
+    return record.model_dump(exclude_unset=True)
+
+def validate_profile_section(name: str, data: Any) -> Dict[str, Any]:
+    """
+    Validate a user_profile section before it is stored.
+
+    Args:
+        name: The section key, such as "academic"
+        data: The section data
+
+    Returns:
+        The validated, coerced section dict
+
+    Raises:
+        StateValidationError: If the section is unknown or the data is invalid
+    """
+    adapter = PROFILE_SECTION_ADAPTERS.get(name)
+    if adapter is None:
+        raise StateValidationError(f"Unknown profile section: {name}")
+    try:
+        return _dump(adapter.validate_python(data))
+    except ValidationError as e:
+        raise _describe(e, f"{name} section") from None
+
+def validate_goal(goal: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a goal before it is stored.
+
+    Args:
+        goal: The goal dict
+
+    Returns:
+        The validated, coerced goal dict, with defaults for missing fields
+
+    Raises:
+        StateValidationError: If the goal is invalid
+    """
+    try:
+        return GOAL_ADAPTER.validate_python(goal).model_dump()
+    except ValidationError as e:
+        raise _describe(e, "goal") from None
+
+def validate_location_fixes(fixes: Any) -> List[Dict[str, Any]]:
+    """
+    Validate location fixes before they are stored.
+
+    Args:
+        fixes: A list of location fix dicts
+
+    Returns:
+        The validated fixes, in their original shape
+
+    Raises:
+        StateValidationError: If the list is too long or any fix is invalid
+    """
+    try:
+        return [_dump(fix) for fix in LOCATION_BATCH_ADAPTER.validate_python(fixes)]
+    except ValidationError as e:
+        raise _describe(e, "location fixes") from None
@@ -0,0 +1,252 @@
+"""
+State Sync Utilities
+
+This module builds versioned state updates for clients so that only the
+top-level state keys changed since the client's last known version are sent.
+Keys listed in NESTED_PATCH_DEPTH are diffed below the top level instead, so a
+small change inside a large value does not resend all of it.
+Sections a session has not written yet can be filled in from a template of
+defaults, so clients always receive the full state shape.
+"""
+
+from typing import Dict, Any, List, Mapping, Optional, Set
+from google.adk.events import Event
+from google.adk.sessions import Session, State
+
+# Top-level keys patched below the top level, and how many levels down. A
+# session_data change is usually one history append or one new profile
+# snapshot, so it is sent as session_data/interaction_history or
+# session_data/profile_snapshots/<key> rather than as the whole section
+NESTED_PATCH_DEPTH = {"session_data": 2}
+
+# Attribute holding the number of a session's events that were not loaded
+EVENT_OFFSET_ATTR = "_event_offset"
+
+def get_event_offset(session: Session) -> int:
+    """
+    Get the number of a session's earliest events that are not in session.events.
+
+    Backends that load only a session's recent events record how many they
+    left out, so event positions stay absolute.
+
+    Args:
+        session: The session to inspect
+
+    Returns:
+        The absolute position of session.events[0]
+    """
+    return getattr(session, EVENT_OFFSET_ATTR, 0)
+
+def set_event_offset(session: Session, offset: int) -> None:
+    """
+    Record how many of a session's earliest events were not loaded.
+
+    Session is a closed pydantic model, so the offset is kept as a plain
+    instance attribute; it survives copy.deepcopy and model_copy.
+
+    Args:
+        session: The session to update
+        offset: The absolute position of session.events[0]
+    """
+    object.__setattr__(session, EVENT_OFFSET_ATTR, offset)
+
+def get_state_version(session: Session) -> int:
+    """
+    Get the state version of a session.
+
+    Every state change is committed through an event, so the absolute number
+    of events in the session is a monotonically increasing version that every
+    worker sharing the session store agrees on.
+
+    Args:
+        session: The session to inspect
+
+    Returns:
+        The current state version
+    """
+    return get_event_offset(session) + len(session.events)
+
+def collect_changed_keys(events: List[Event], since_version: int) -> Set[str]:
+    """
+    Collect the state keys touched by events after a given version.
+
+    Args:
+        events: The session events
+        since_version: The version the client already has, counted from
+            events[0] (see changed_keys_since for sessions with an offset)
+
+    Returns:
+        Set of top-level state keys changed since that version
+    """
+    keys = set()
+    for event in events[since_version:]:
+        if event.actions and event.actions.state_delta:
+            keys.update(event.actions.state_delta.keys())
+    return keys
+
+def changed_keys_since(session: Session, since_version: int) -> Optional[Set[str]]:
+    """
+    Collect the state keys a session changed after a given version.
+
+    Args:
+        session: The session
+        since_version: The version the client already has
+
+    Returns:
+        Set of top-level state keys changed since that version, or None if
+        the events after it are not all loaded
+    """
+    offset = get_event_offset(session)
+    if since_version < offset:
+        return None
+    return collect_changed_keys(session.events, since_version - offset)
+
+# Marks a state value that has not been written
+_MISSING = object()
+
+# Marks a past state value that can no longer be found
+_UNKNOWN = object()
+
+def _with_defaults(value: Any, default: Any) -> Any:
+    """
+    Fill in the sections of a value that are missing from its default.
+
+    Defaults may be read-only (mappings and tuples); the sections taken from
+    them are returned as plain dicts and lists. Sections of the value are
+    shared, not copied.
+    """
+    if value is _MISSING:
+        if isinstance(default, Mapping):
+            return {key: _with_defaults(_MISSING, item) for key, item in default.items()}
+        if isinstance(default, (list, tuple)):
+            return [_with_defaults(_MISSING, item) for item in default]
+        return default
+    if isinstance(value, Mapping) and isinstance(default, Mapping):
+        merged = dict(value)
+        for key, item in default.items():
+            merged[key] = _with_defaults(value.get(key, _MISSING), item)
+        return merged
+    return value
+
+def _escape_pointer(key: str) -> str:
+    """Escape a state key for use as a JSON Pointer path segment."""
+    return "/" + key.replace("~", "~0").replace("/", "~1")
+
+def _value_at(session: Session, key: str, version: int) -> Any:
+    """
+    Get the value a state key had at a version.
+
+    Each state delta carries the whole new value of its keys, so the value is
+    the one set by the last event at or before the version. It is unknown if
+    no loaded event set the key (it may have been part of the initial state).
+    """
+    offset = get_event_offset(session)
+    for position in range(version - offset - 1, -1, -1):
+        actions = session.events[position].actions
+        if actions and actions.state_delta and key in actions.state_delta:
+            return actions.state_delta[key]
+    return _UNKNOWN
+
+def _diff_ops(
+    path: str,
+    old: Any,
+    new: Any,
+    default: Any,
+    depth: int,
+    ops: List[Dict[str, Any]]
+) -> None:
+    """Append the operations that turn an old value into a new one, up to a depth."""
+    if depth > 0 and isinstance(old, Mapping) and isinstance(new, Mapping):
+        if not isinstance(default, Mapping):
+            default = {}
+        for key in sorted(set(old) | set(new)):
+            _diff_ops(
+                path + _escape_pointer(key),
+                old.get(key, _MISSING),
+                new.get(key, _MISSING),
+                default.get(key, _MISSING),
+                depth - 1,
+                ops
+            )
+        return
+    if old is not _MISSING and new is not _MISSING and old == new:
+        return
+    if default is not _MISSING:
+        new = _with_defaults(new, default)
+    if new is _MISSING:
+        if old is not _MISSING:
+            ops.append({"op": "remove", "path": path})
+    else:
+        ops.append({"op": "add", "path": path, "value": new})
+
+def build_state_message(
+    session: Session,
+    since_version: Optional[int] = None,
+    defaults: Optional[Mapping[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build the state message for a client at a known version.
+
+    If the client's version is unknown or no longer valid, the full state is
+    sent. Otherwise a JSON-Patch-style list of operations covering only the
+    keys changed since that version is returned; keys in NESTED_PATCH_DEPTH
+    are diffed against their value at that version when it is still known.
+    With defaults, every value sent has its unwritten sections filled in from
+    them, and a removed key that has a default is reset to it rather than
+    removed.
+
+    Args:
+        session: The current session
+        since_version: The version the client already has, or None for a full resync
+        defaults: Template of default values for the top-level keys
+
+    Returns:
+        Either a "state" message with the full state or a "state_patch" message
+    """
+    version = get_state_version(session)
+    changed = None
+    if since_version is not None and 0 <= since_version <= version:
+        changed = changed_keys_since(session, since_version)
+    defaults = defaults or {}
+    if changed is None:
+        return {
+            "type": "state",
+            "version": version,
+            "state": _with_defaults(session.state, defaults)
+        }
+
+    ops = []
+    for key in sorted(changed):
+        if key.startswith(State.TEMP_PREFIX):
+            continue
+        value = session.state.get(key, _MISSING)
+        depth = NESTED_PATCH_DEPTH.get(key, 0)
+        if depth:
+            old = _value_at(session, key, since_version)
+            if old is not _UNKNOWN and isinstance(old, Mapping) and isinstance(value, Mapping):
+                _diff_ops(
+                    _escape_pointer(key),
+                    old,
+                    value,
+                    defaults.get(key, _MISSING),
+                    depth,
+                    ops
+                )
+                continue
+        if key in defaults:
+            value = _with_defaults(value, defaults[key])
+        if value is not _MISSING:
+            ops.append({
+                "op": "add",
+                "path": _escape_pointer(key),
+                "value": value
+            })
+        else:
+            ops.append({"op": "remove", "path": _escape_pointer(key)})
+
+    return {
+        "type": "state_patch",
+        "base_version": since_version,
+        "version": version,
+        "ops": ops
+    }
@@ -2,79 +2,307 @@
 State Management Utilities
 
 This module provides utility functions for managing session state.
+
+All writes go through state_transaction(): helpers join the caller's
+transaction when given one and open their own otherwise, and only the
+top-level keys a transaction changed are written when it exits.
 """
 
+import weakref
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Union
+from types import MappingProxyType
+from typing import Callable, Dict, Any, Iterator, List, Mapping, Set, Union
+from google.adk.events import Event, EventActions
+from google.adk.sessions import Session
 from google.adk.tools import ToolContext
-
-def initialize_state() -> Dict[str, Any]:
-    """Initialize the session state with default values."""
-    return {
-        "user_info": {
-            "name": None,
-            "grade_level": None,
-            "location": None
-        },
-        "goals": [],
-        "progress": {
-            "test_prep": {},
-            "essays": {},
+from .history_store import append_history, read_history
+from .snapshot_store import store_snapshot, resolve_entry
+from .goal_store import iter_goals
+
+def _freeze(value: Any) -> Any:
+    """Make a read-only copy of a JSON-like value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    """Make a mutable copy of a frozen value."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+# The full state template, shared by all sessions and never mutated. A new
+# session's state starts empty; readers fall back to these defaults and a
+# section is materialized in the session only when it is first written.
+DEFAULT_STATE = _freeze({
+    "user_info": {
+        "name": None,
+        "grade_level": None,
+        "location": None
+    },
+    "progress": {
+        "test_prep": {},
+        "essays": {},
+        "extracurriculars": {},
+        "recommendation_letters": {}
+    },
+    "interaction_history": [],
+    "university_preferences": [],
+    "session_data": {
+        "user_profile": {
+            "background": {},
+            "academic": {},
+            "university_preferences": {},
+            "financial_constraints": {},
+            "application_readiness": {},
             "extracurriculars": {},
-            "recommendation_letters": {}
-        },
-        "interaction_history": [],
-        "university_preferences": [],
-        "session_data": {
-            "user_profile": {
-                "background": {},
-                "academic": {},
-                "university_preferences": {},
-                "financial_constraints": {},
-                "application_readiness": {},
-                "extracurriculars": {},
-                "aspirations": {}
-            }
+            "aspirations": {}
         }
     }
+})
+
+def state_default(*path: str) -> Any:
+    """
+    Get a mutable copy of the default value at a path in the state template.
+    
+    Containers are returned empty; they are filled by later writes, and their
+    own sections fall back to their defaults in turn. Leaf records such as
+    user_info are returned in full.
+    
+    Args:
+        path: Keys leading from the top of the state to the value
+        
+    Returns:
+        The default value, or None if the path is not in the template
+    """
+    value = DEFAULT_STATE
+    for key in path:
+        if not isinstance(value, Mapping) or key not in value:
+            return None
+        value = value[key]
+    if isinstance(value, Mapping) and any(isinstance(item, Mapping) for item in value.values()):
+        return {}
+    return _thaw(value)
+
+def initialize_state() -> Dict[str, Any]:
+    """
+    Initialize the session state.
+    
+    The state starts empty and shares DEFAULT_STATE for every section that
+    has not been written yet; see state_default.
+    """
+    return {}
+
+def _merge_into(
+    target: Dict[str, Any],
+    patch: Dict[str, Any],
+    prefix: str,
+    touched: List[str]
+) -> Dict[str, Any]:
+    """Recursively merge a patch into a copy of a nested dict, recording changed paths."""
+    merged = dict(target)
+    for key, value in patch.items():
+        path = f"{prefix}/{key}"
+        current = merged.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            merged[key] = _merge_into(current, value, path, touched)
+        else:
+            merged[key] = value
+            touched.append(path)
+    return merged
+
+def merge_patch(state: Any, patch: Dict[str, Any]) -> List[str]:
+    """
+    Deep-merge a patch into state.
+    
+    Nested dicts are merged key by key; any other value replaces what was
+    there. The dicts along the patched paths are copied shallowly and each
+    changed top-level key is reassigned, so the values the state held are
+    never modified and the cost is proportional to the patch, not to the
+    state. Works on plain dicts, on a ToolContext's state, where reassigning
+    a key records it in the pending state delta, and on a StateTransaction.
+    
+    Args:
+        state: The state mapping to update
+        patch: Nested mapping of changes
+        
+    Returns:
+        List of the changed paths, such as "/session_data/user_profile/academic"
+    """
+    touched = []
+    for key, value in patch.items():
+        current = state.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            count = len(touched)
+            merged = _merge_into(current, value, f"/{key}", touched)
+            if len(touched) > count:
+                state[key] = merged
+        else:
+            state[key] = value
+            touched.append(f"/{key}")
+    return touched
 
-def update_state(
+def commit_state_delta(
     session_service,
-    app_name: str,
-    user_id: str,
-    session_id: str,
-    updates: Dict[str, Any]
+    session: Session,
+    delta: Dict[str, Any]
 ) -> None:
-    """Update specific fields in the session state."""
-    try:
-        # Get current session
-        session = session_service.get_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id
-        )
-
-        # Create updated state
-        updated_state = session.state.copy()
+    """
+    Persist changed top-level state keys for a session in a single write.
+    
+    The delta is committed as an event, the same way the runner commits state
+    changes made by tools, so the session's other keys and events are kept.
+    
+    Args:
+        session_service: The session service storing the session
+        session: The session to update; its state is updated in place
+        delta: Mapping of top-level state keys to their new values
+    """
+    event = Event(
+        invocation_id=Event.new_id(),
+        author="user",
+        actions=EventActions(state_delta=delta)
+    )
+    session_service.append_event(session=session, event=event)
+
+class StateTransaction:
+    """
+    A unit of work over session state.
+    
+    Reads see the transaction's own writes first, then the live values of the
+    underlying state; nothing is copied on read. Assigned keys are staged and
+    reach the underlying state only when the transaction commits, and then
+    only the keys that were assigned or touch()ed are written. Writers
+    should assign new values rather than modify the ones they read (as
+    merge_patch and append_history do); code that must change a value in
+    place touch()es its key and registers an undo step with on_rollback().
+    Use state_transaction() rather than committing by hand.
+    
+    A transaction can be passed anywhere a context dictionary is accepted,
+    such as the getters and update helpers in this module.
+    """
+    
+    def __init__(self, state):
+        """
+        Args:
+            state: The underlying state: a ToolContext's state, a session's
+                state or a plain dict
+        """
+        self._state = state
+        self._staged: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._undo: List[Callable[[], None]] = []
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._staged:
+            return self._staged[key]
+        if key in self._state:
+            return self._state[key]
+        return default
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, StateTransaction)
+        if value is StateTransaction:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._staged[key] = value
+        self._dirty.add(key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._staged or key in self._state
+    
+    def touch(self, *keys: str) -> None:
+        """Mark top-level keys whose values were changed in place as written."""
+        for key in keys:
+            self[key] = self[key]
+    
+    def on_rollback(self, undo: Callable[[], None]) -> None:
+        """Register a step that reverts an in-place change if the transaction fails."""
+        self._undo.append(undo)
+    
+    def changes(self) -> Dict[str, Any]:
+        """Get the top-level keys written in this transaction and their values."""
+        return {key: self._staged[key] for key in self._dirty}
+    
+    def rollback(self) -> None:
+        """Discard the staged writes and revert in-place changes, newest first."""
+        while self._undo:
+            self._undo.pop()()
+        self._staged.clear()
+        self._dirty.clear()
+
+@contextmanager
+def state_transaction(
+    context: Union[ToolContext, Session, Dict[str, Any]],
+    session_service=None
+) -> Iterator[StateTransaction]:
+    """
+    Buffer state writes and commit them together when the block exits.
+    
+    On a ToolContext the changed keys are written to its state once each, so
+    the runner commits them in the tool call's single state delta. On a
+    Session they are committed with one commit_state_delta call. If the block
+    raises, every buffered write is discarded.
+    
+    Args:
+        context: The tool context, session or context dictionary to update
+        session_service: The session service storing the session; required
+            when context is a Session
         
-        # Update the state with new values
-        for key, value in updates.items():
-            if isinstance(value, dict) and key in updated_state:
-                updated_state[key].update(value)
-            else:
-                updated_state[key] = value
-
-        # Create a new session with updated state
-        session_service.create_session(
-            app_name=app_name,
-            user_id=user_id,
-            session_id=session_id,
-            state=updated_state
-        )
-    except Exception as e:
-        print(f"Error updating state: {e}")
-        # Fallback to local state management
-        return updates
+    Yields:
+        The transaction to read and write through
+    """
+    if isinstance(context, Session):
+        if session_service is None:
+            raise ValueError("A session service is required to commit to a session")
+        state = context.state
+    elif isinstance(context, ToolContext):
+        state = context.state
+    else:
+        state = context
+    
+    transaction = StateTransaction(state)
+    try:
+        yield transaction
+    except BaseException:
+        transaction.rollback()
+        raise
+    
+    changes = transaction.changes()
+    if not changes:
+        return
+    if isinstance(context, Session):
+        try:
+            commit_state_delta(session_service, context, changes)
+        except BaseException:
+            transaction.rollback()
+            raise
+    else:
+        for key, value in changes.items():
+            state[key] = value
+        invalidate_profile_view(context)
+
+@contextmanager
+def _writes(context: Any) -> Iterator[StateTransaction]:
+    """
+    Join the caller's transaction, or open one for a single helper call.
+    
+    Helpers report their own failures only when they opened the transaction;
+    inside a caller's transaction they re-raise, so the caller's whole unit of
+    work rolls back instead of committing part of it.
+    """
+    if isinstance(context, StateTransaction):
+        yield context
+    else:
+        with state_transaction(context) as transaction:
+            yield transaction
 
 def add_to_interaction_history(
     session_service,
@@ -92,28 +320,15 @@ def add_to_interaction_history(
             session_id=session_id
         )
 
-        # Get current interaction history
-        interaction_history = session.state.get("interaction_history", [])
-
         # Add timestamp if not present
         if "timestamp" not in entry:
             entry["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # Add the entry
-        interaction_history.append(entry)
-
-        # Update state
-        update_state(
-            session_service,
-            app_name,
-            user_id,
-            session_id,
-            {"interaction_history": interaction_history}
-        )
+        # Add the entry, spilling old entries out of state if needed
+        with state_transaction(session, session_service) as state:
+            append_history(state, entry, state.on_rollback)
     except Exception as e:
         print(f"Error adding to interaction history: {e}")
-        # Fallback to local state management
-        return {"interaction_history": [entry]}
 
 def display_state(
     session_service,
@@ -140,7 +355,7 @@ def display_state(
                 print(f"  {key}: {value}")
 
         # Display goals
-        goals = session.state.get("goals", [])
+        goals = list(iter_goals(session.state))
         if goals:
             print("\n🎯 Goals:")
             for idx, goal in enumerate(goals, 1):
@@ -181,28 +396,84 @@ def update_interaction_history(
         data: The data associated with the action
     """
     try:
-        session_state = get_session_state(context)
-        history = session_state.get("interaction_history", [])
-        history.append({
-            "action": action,
-            "data": data,
-            "timestamp": datetime.now().isoformat()
-        })
-        if isinstance(context, ToolContext):
-            context.state["session_data"] = session_state
-        else:
-            context["session_data"] = session_state
+        with _writes(context) as state:
+            session_state = dict(get_session_state(state))
+            append_history(session_state, {
+                "action": action,
+                "data": data,
+                "timestamp": datetime.now().isoformat()
+            }, state.on_rollback)
+            state["session_data"] = session_state
     except Exception as e:
+        if isinstance(context, StateTransaction):
+            # Let the caller's transaction roll back as a whole
+            raise
         print(f"Error updating interaction history: {e}")
-        # Fallback to local state management
-        if isinstance(context, dict):
-            context["session_data"] = {
-                "interaction_history": [{
-                    "action": action,
-                    "data": data,
-                    "timestamp": datetime.now().isoformat()
-                }]
+
+def log_profile_analysis(
+    context: Union[ToolContext, Dict[str, Any]],
+    action: str,
+    sections: Dict[str, Any]
+) -> None:
+    """
+    Log an analysis of profile sections without copying them into history.
+    
+    Each section is stored once as a content-addressed snapshot and the
+    history entry records only the snapshot keys.
+    
+    Args:
+        context: The tool context or context dictionary
+        action: The action performed
+        sections: Mapping of section labels to the profile data analyzed
+    """
+    try:
+        with _writes(context) as state:
+            session_state = dict(get_session_state(state))
+            refs = {
+                name: store_snapshot(session_state, data)
+                for name, data in sections.items()
             }
+            state["session_data"] = session_state
+            update_interaction_history(
+                state,
+                action,
+                {"status": "success", "snapshots": refs}
+            )
+    except Exception as e:
+        if isinstance(context, StateTransaction):
+            # Let the caller's transaction roll back as a whole
+            raise
+        print(f"Error logging profile analysis: {e}")
+
+def get_interaction_history(
+    context: Union[ToolContext, Dict[str, Any]],
+    offset: int = 0,
+    limit: int = 20,
+    resolve_snapshots: bool = False
+) -> Dict[str, Any]:
+    """
+    Get a page of the interaction history, including spilled entries.
+    
+    Args:
+        context: The tool context or context dictionary
+        offset: Position of the first entry to return (0 is the oldest)
+        limit: Maximum number of entries to return
+        resolve_snapshots: Whether to expand profile snapshot references
+        
+    Returns:
+        Dict with the entries, the total entry count, offset and limit
+    """
+    try:
+        session_state = get_session_state(context)
+        page = read_history(session_state, offset, limit)
+        if resolve_snapshots:
+            page["entries"] = [
+                resolve_entry(session_state, entry) for entry in page["entries"]
+            ]
+        return page
+    except Exception as e:
+        print(f"Error getting interaction history: {e}")
+        return {"entries": [], "total": 0, "offset": offset, "limit": limit}
 
 def get_session_state(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -216,8 +487,8 @@ def get_session_state(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str,
     """
     try:
         if isinstance(context, ToolContext):
-            return context.state.get("session_data", {})
-        return context.get("session_data", {})
+            return context.state.get("session_data", state_default("session_data"))
+        return context.get("session_data", state_default("session_data"))
     except Exception as e:
         print(f"Error getting session state: {e}")
         return {}
@@ -234,11 +505,83 @@ def get_user_profile(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str, A
     """
     try:
         session_state = get_session_state(context)
-        return session_state.get("user_profile", {})
+        return session_state.get("user_profile", state_default("session_data", "user_profile"))
     except Exception as e:
         print(f"Error getting user profile: {e}")
         return {}
 
+class ProfileView:
+    """
+    Memoized access to the sections of one user profile.
+    
+    The path state -> session_data -> user_profile is walked once, when the
+    view is built, and each section is looked up once and then served from
+    the view. Views of a ToolContext are shared by every getter call made
+    during that tool invocation; see get_profile_view.
+    """
+    
+    __slots__ = ("_profile", "_sections", "__weakref__")
+    
+    def __init__(self, profile: Dict[str, Any]):
+        """
+        Args:
+            profile: The user_profile dict the view reads from
+        """
+        self._profile = profile
+        self._sections: Dict[str, Dict[str, Any]] = {}
+    
+    def section(self, name: str) -> Dict[str, Any]:
+        """
+        Get a profile section.
+        
+        Args:
+            name: The section key, such as "background" or "academic"
+            
+        Returns:
+            The stored section, or its default if it has not been written
+        """
+        try:
+            return self._sections[name]
+        except KeyError:
+            value = self._profile.get(name)
+            if value is None:
+                value = state_default("session_data", "user_profile", name)
+            self._sections[name] = value
+            return value
+    
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        return self.section(name)
+
+# Profile views of live tool invocations, dropped with their ToolContext
+_profile_views: "weakref.WeakKeyDictionary[ToolContext, ProfileView]" = weakref.WeakKeyDictionary()
+
+def get_profile_view(context: Union[ToolContext, Dict[str, Any]]) -> ProfileView:
+    """
+    Get the profile view for a context.
+    
+    A ToolContext's view is built on first use and reused until state is
+    written through one of the helpers in this module, which invalidate it.
+    Other contexts get a fresh view.
+    
+    Args:
+        context: The tool context or context dictionary
+        
+    Returns:
+        The profile view
+    """
+    if isinstance(context, ToolContext):
+        view = _profile_views.get(context)
+        if view is None:
+            view = ProfileView(get_user_profile(context))
+            _profile_views[context] = view
+        return view
+    return ProfileView(get_user_profile(context))
+
+def invalidate_profile_view(context: Any) -> None:
+    """Drop the cached profile view of a context after its state is written."""
+    if isinstance(context, ToolContext):
+        _profile_views.pop(context, None)
+
 def get_user_background(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str, Any]:
     """
     Get the user background from the context.
@@ -250,8 +593,7 @@ def get_user_background(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str
         Dict containing user background
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("background", {})
+        return get_profile_view(context).section("background")
     except Exception as e:
         print(f"Error getting user background: {e}")
         return {}
@@ -267,8 +609,7 @@ def get_academic_profile(context: Union[ToolContext, Dict[str, Any]]) -> Dict[st
         Dict containing academic profile
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("academic", {})
+        return get_profile_view(context).section("academic")
     except Exception as e:
         print(f"Error getting academic profile: {e}")
         return {}
@@ -284,8 +625,7 @@ def get_university_preferences(context: Union[ToolContext, Dict[str, Any]]) -> D
         Dict containing university preferences
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("university_preferences", {})
+        return get_profile_view(context).section("university_preferences")
     except Exception as e:
         print(f"Error getting university preferences: {e}")
         return {}
@@ -301,8 +641,7 @@ def get_financial_constraints(context: Union[ToolContext, Dict[str, Any]]) -> Di
         Dict containing financial constraints
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("financial_constraints", {})
+        return get_profile_view(context).section("financial_constraints")
     except Exception as e:
         print(f"Error getting financial constraints: {e}")
         return {}
@@ -318,8 +657,7 @@ def get_application_readiness(context: Union[ToolContext, Dict[str, Any]]) -> Di
         Dict containing application readiness
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("application_readiness", {})
+        return get_profile_view(context).section("application_readiness")
     except Exception as e:
         print(f"Error getting application readiness: {e}")
         return {}
@@ -335,8 +673,7 @@ def get_extracurriculars(context: Union[ToolContext, Dict[str, Any]]) -> Dict[st
         Dict containing extracurricular activities
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("extracurriculars", {})
+        return get_profile_view(context).section("extracurriculars")
     except Exception as e:
         print(f"Error getting extracurriculars: {e}")
         return {}
@@ -352,8 +689,7 @@ def get_aspirations(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str, An
         Dict containing aspirations
     """
     try:
-        profile = get_user_profile(context)
-        return profile.get("aspirations", {})
+        return get_profile_view(context).section("aspirations")
     except Exception as e:
         print(f"Error getting aspirations: {e}")
         return {}
@@ -370,8 +706,8 @@ def get_user_info(context: Union[ToolContext, Dict[str, Any]]) -> Dict[str, Any]
     """
     try:
         if isinstance(context, ToolContext):
-            return context.state.get("user_info", {})
-        return context.get("user_info", {})
+            return context.state.get("user_info", state_default("user_info"))
+        return context.get("user_info", state_default("user_info"))
     except Exception as e:
         print(f"Error getting user info: {e}")
         return {}
@@ -388,23 +724,13 @@ def update_user_info(
         updates: Dictionary of user information to update
     """
     try:
-        # Get current user info
-        user_info = get_user_info(context)
-        
-        # Update with new information
-        user_info.update(updates)
-        
-        # Update state
-        if isinstance(context, ToolContext):
-            context.state["user_info"] = user_info
-        else:
-            context["user_info"] = user_info
-        
+        with _writes(context) as state:
+            state["user_info"] = {**get_user_info(state), **updates}
     except Exception as e:
+        if isinstance(context, StateTransaction):
+            # Let the caller's transaction roll back as a whole
+            raise
         print(f"Error updating user info: {e}")
-        # Fallback to local state management
-        if isinstance(context, dict):
-            context["user_info"] = updates
 
 def get_goals(context: Union[ToolContext, Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -418,8 +744,8 @@ def get_goals(context: Union[ToolContext, Dict[str, Any]]) -> List[Dict[str, Any
     """
     try:
         if isinstance(context, ToolContext):
-            return context.state.get("goals", [])
-        return context.get("goals", [])
+            return list(iter_goals(context.state))
+        return list(iter_goals(context))
     except Exception as e:
         print(f"Error getting goals: {e}")
         return []
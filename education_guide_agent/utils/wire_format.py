@@ -0,0 +1,180 @@
+"""
+Wire Format Utilities
+
+This module encodes websocket messages in the format negotiated by a client.
+
+Clients choose a format with the ?format= query parameter (json, orjson or
+msgpack) and an optional compression with ?compress= (deflate or zstd). Plain
+JSON text frames remain the default. Any other combination is sent as binary
+frames whose first byte tells how the rest of the frame is compressed:
+    0x00 - not compressed
+    0x01 - zlib (deflate)
+    0x02 - zstd
+Only payloads of at least WIRE_COMPRESS_MIN_BYTES are compressed, so small
+messages such as streamed text chunks are not slowed down.
+
+Transport-level permessage-deflate is negotiated separately by the websocket
+server and stays available to clients that ask for it.
+"""
+
+import json
+import os
+import zlib
+from typing import Dict, Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Payloads smaller than this are sent uncompressed
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
+
+FORMATS = ("json", "orjson", "msgpack")
+COMPRESSIONS = ("none", "deflate", "zstd")
+
+FRAME_RAW = 0x00
+FRAME_DEFLATE = 0x01
+FRAME_ZSTD = 0x02
+
+def available_formats() -> Dict[str, bool]:
+    """Get which formats and compressions this server can produce."""
+    return {
+        "json": True,
+        "orjson": orjson is not None,
+        "msgpack": msgpack is not None,
+        "deflate": True,
+        "zstd": zstandard is not None
+    }
+
+class WireCodec:
+    """Encode messages for one client in its negotiated format."""
+
+    def __init__(
+        self,
+        fmt: str = "json",
+        compression: str = "none",
+        min_compress_bytes: int = WIRE_COMPRESS_MIN_BYTES
+    ):
+        """
+        Args:
+            fmt: Serialization format, one of FORMATS
+            compression: Compression for large payloads, one of COMPRESSIONS
+            min_compress_bytes: Smallest payload that is compressed
+
+        Raises:
+            ValueError: If the format or compression is unknown or unavailable
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown wire format: {fmt}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        available = available_formats()
+        if not available[fmt]:
+            raise ValueError(f"Wire format not available on this server: {fmt}")
+        if compression != "none" and not available[compression]:
+            raise ValueError(f"Compression not available on this server: {compression}")
+
+        self.format = fmt
+        self.compression = compression
+        self.min_compress_bytes = min_compress_bytes
+        self._zstd = zstandard.ZstdCompressor(level=3) if compression == "zstd" else None
+
+    @property
+    def is_text(self) -> bool:
+        """Whether messages are sent as plain JSON text frames."""
+        return self.format == "json" and self.compression == "none"
+
+    def describe(self) -> Dict[str, str]:
+        """Get the negotiated settings to report to the client."""
+        return {"format": self.format, "compression": self.compression}
+
+    def serialize(self, message: Dict[str, Any]) -> Union[str, bytes]:
+        """
+        Serialize a message without compression or framing.
+
+        Args:
+            message: The message to serialize
+
+        Returns:
+            A str for JSON, bytes for the binary formats
+        """
+        if self.format == "orjson":
+            return orjson.dumps(message)
+        if self.format == "msgpack":
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def encode(self, message: Dict[str, Any]) -> Union[str, bytes]:
+        """
+        Encode a message into a websocket frame payload.
+
+        Args:
+            message: The message to encode
+
+        Returns:
+            A str to send as a text frame, or bytes to send as a binary frame
+        """
+        payload = self.serialize(message)
+        if self.is_text:
+            return payload
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+
+        if self.compression != "none" and len(payload) >= self.min_compress_bytes:
+            if self.compression == "zstd":
+                return bytes([FRAME_ZSTD]) + self._zstd.compress(payload)
+            return bytes([FRAME_DEFLATE]) + zlib.compress(payload, 6)
+        return bytes([FRAME_RAW]) + payload
+
+def negotiate_codec(params) -> WireCodec:
+    """
+    Build the codec requested by a client's query parameters.
+
+    Args:
+        params: Mapping of query parameters
+
+    Returns:
+        The negotiated codec
+
+    Raises:
+        ValueError: If the client asked for an unknown or unavailable option
+    """
+    fmt = (params.get("format") or "json").lower()
+    compression = (params.get("compress") or "none").lower()
+    return WireCodec(fmt, compression)
+
+def decode_frame(frame: Union[str, bytes], fmt: str = "json") -> Optional[Dict[str, Any]]:
+    """
+    Decode a frame produced by WireCodec.encode.
+
+    Used by the wire format benchmark to check round trips; clients implement
+    the same steps.
+
+    Args:
+        frame: The frame payload
+        fmt: The negotiated serialization format
+
+    Returns:
+        The decoded message
+    """
+    if isinstance(frame, str):
+        return json.loads(frame)
+    flag, payload = frame[0], frame[1:]
+    if flag == FRAME_DEFLATE:
+        payload = zlib.decompress(payload)
+    elif flag == FRAME_ZSTD:
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    if fmt == "msgpack":
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
@@ -1,163 +1,773 @@
 """
 Web application for the Education Guide Agent.
+
+The app is built by create_app(). The agent graph is not imported with this
+module; it is loaded by a background warm-up task at startup (or on the first
+agent turn when AGENT_WARMUP=lazy), and /ready reports when it is available.
 """
 
+import time
+
+# Measured from here so the startup report covers this module's own imports
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import importlib
+import json
+import os
 import uuid
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from typing import Dict, Any, List, Optional, Set, Callable, Awaitable
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from utils.state_utils import initialize_state
-from agent import root_agent
-
-# Create FastAPI app
-app = FastAPI(title="Education Guide Agent")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from google.adk.sessions import Session
+from google.genai import types
+from .utils.state_utils import (
+    DEFAULT_STATE,
+    initialize_state,
+    commit_state_delta,
+    get_interaction_history
 )
+from .utils.location_utils import (
+    LOCATION_DEDUP_METERS,
+    LOCATION_DEDUP_SECONDS,
+    LOCATION_RETENTION,
+    RECEIVED_AT_KEY,
+    add_fixes,
+    cap_locations,
+    coalesce_fixes
+)
+from .utils.state_sync import build_state_message, changed_keys_since
+from .utils.admission import TurnGate
+from .utils.session_backends import create_session_service
+from .utils.wire_format import negotiate_codec
+from .utils.state_schemas import StateValidationError, validate_location_fixes
+from .utils.goal_store import changed_goal_ids
+from .utils.deadline_scheduler import (
+    DEADLINE_SWEEP_INTERVAL,
+    REMINDERS_KEY,
+    DeadlineScheduler,
+    reminder_markers
+)
+
+# Routes are collected on a router and mounted by create_app()
+router = APIRouter()
 
-# Create session service
-session_service = InMemorySessionService()
+# Create session service (set SESSION_BACKEND=database to share sessions
+# between worker processes)
+session_service = create_session_service()
 
 # Constants
 APP_NAME = "education_guide"
 USER_ID = "user"  # In a real app, this would come from user authentication
 
-@app.get("/")
-async def root():
-    """Root endpoint to verify API is running."""
-    return {"message": "Education Guide API is running"}
+# "background" loads the agent graph as soon as the app starts; "lazy" waits
+# for the first agent turn
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "background").lower()
 
-@app.post("/api/location")
-async def receive_location(location_data: dict):
-    """Endpoint to receive location data from the browser."""
+# The process-wide runner is created once the agent graph is loaded; it holds
+# no per-connection state and is shared by every socket
+warmup: Dict[str, Any] = {
+    "runner": None,
+    "task": None,
+    "error": None,
+    "agent_load_seconds": None,
+    "module_import_seconds": None
+}
+
+# Maximum number of agent turns allowed in flight at once on this worker
+MAX_CONCURRENT_TURNS = int(os.getenv("MAX_CONCURRENT_TURNS", "8"))
+turn_gate = TurnGate(MAX_CONCURRENT_TURNS)
+
+# Maximum number of messages a single socket may have waiting for a turn
+WS_INBOX_SIZE = int(os.getenv("WS_INBOX_SIZE", "4"))
+
+# Inboxes of the sockets currently connected to this worker
+open_inboxes: Set[asyncio.Queue] = set()
+
+# Goal and milestone deadlines of the sessions this worker has served
+deadline_scheduler = DeadlineScheduler()
+
+# Send functions of the sockets connected to each session
+session_senders: Dict[str, Set[Callable[[Dict[str, Any]], Awaitable[None]]]] = {}
+
+# Reminders that came due while their session had no socket, sent on connect
+REMINDER_BACKLOG = int(os.getenv("REMINDER_BACKLOG", "20"))
+undelivered_reminders: Dict[str, List[Dict[str, Any]]] = {}
+
+# Accepted location fixes not yet written to their session. They are written
+# at most every LOCATION_FLUSH_INTERVAL seconds, before the session's agent
+# turns and at shutdown, so a client sending a fix every few seconds adds one
+# event per interval rather than one per fix
+LOCATION_FLUSH_INTERVAL = float(os.getenv("LOCATION_FLUSH_INTERVAL", "30"))
+pending_locations: Dict[str, List[Dict[str, Any]]] = {}
+
+# Whether sockets stream partial output unless they ask otherwise (?stream=0/1)
+STREAM_BY_DEFAULT = os.getenv("STREAM_RESPONSES", "false").lower() == "true"
+
+def _load_root_agent():
+    """Import the agent graph (all sub-agents and tools)."""
+    return importlib.import_module(".agent", __package__).root_agent
+
+async def _warm_up() -> Runner:
+    """Load the agent graph off the event loop and create the shared runner."""
+    started = time.perf_counter()
     try:
-        # Get or create session
-        sessions = session_service.list_sessions(
-            app_name=APP_NAME,
-            user_id=USER_ID
+        root_agent = await asyncio.to_thread(_load_root_agent)
+    except Exception as e:
+        warmup["error"] = str(e)
+        print(f"Agent graph failed to load: {e}")
+        raise
+    warmup["agent_load_seconds"] = round(time.perf_counter() - started, 3)
+    warmup["runner"] = Runner(
+        agent=root_agent,
+        app_name=APP_NAME,
+        session_service=session_service
+    )
+    print(f"Agent graph loaded in {warmup['agent_load_seconds']:.3f}s")
+    return warmup["runner"]
+
+def start_warm_up() -> asyncio.Task:
+    """Start loading the agent graph unless it is already loading or loaded."""
+    if warmup["task"] is None:
+        warmup["error"] = None
+        warmup["task"] = asyncio.create_task(_warm_up())
+        # The failure is recorded in warmup["error"]; mark it as retrieved
+        warmup["task"].add_done_callback(
+            lambda task: task.cancelled() or task.exception()
         )
+    return warmup["task"]
+
+async def get_runner() -> Runner:
+    """
+    Get the shared runner, loading the agent graph first if needed.
+    
+    Returns:
+        The process-wide runner
         
-        if not sessions.sessions:
-            # Create new session with initial state
-            session_id = str(uuid.uuid4())
-            initial_state = initialize_state()
-            session = session_service.create_session(
-                app_name=APP_NAME,
-                user_id=USER_ID,
-                session_id=session_id,
-                state=initial_state
-            )
-        else:
-            # Use existing session
-            session = sessions.sessions[0]
-            session_id = session.id
+    Raises:
+        RuntimeError: If the agent graph failed to load
+    """
+    if warmup["runner"] is not None:
+        return warmup["runner"]
+    task = start_warm_up()
+    try:
+        return await asyncio.shield(task)
+    except Exception as e:
+        # Allow a later call to retry the warm-up
+        if task.done():
+            warmup["task"] = None
+        raise RuntimeError(f"Agent is not available: {e}")
+
+def wants_streaming(websocket: WebSocket) -> bool:
+    """Check whether the client asked for streaming output on this socket."""
+    value = websocket.query_params.get("stream")
+    if value is None:
+        return STREAM_BY_DEFAULT
+    return value.lower() in ("1", "true", "yes")
+
+# Structured messages a client may send instead of plain chat text
+CONTROL_MESSAGE_TYPES = {"message", "resync"}
+
+def parse_client_message(data: str) -> Dict[str, Any]:
+    """
+    Interpret an incoming frame as a control message or plain chat text.
+    
+    Args:
+        data: The raw text received from the socket
+        
+    Returns:
+        A message dictionary with at least a "type" key
+    """
+    if data.startswith("{"):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            message = None
+        if isinstance(message, dict) and message.get("type") in CONTROL_MESSAGE_TYPES:
+            return message
+    return {"type": "message", "text": data}
+
+def event_to_messages(event: Event, stream: bool) -> List[Dict[str, Any]]:
+    """
+    Convert an agent event into the messages sent to the client.
+    
+    Args:
+        event: The event produced by the runner
+        stream: Whether the client receives partial text and tool progress
         
-        # Update location in state
-        locations = session.state.get("locations", [])
-        locations.append(location_data)
-        session.state["locations"] = locations
+    Returns:
+        List of JSON-serializable messages, possibly empty
+    """
+    messages = []
+    if stream:
+        for call in event.get_function_calls():
+            messages.append({
+                "type": "tool_call",
+                "agent": event.author,
+                "name": call.name
+            })
+        for response in event.get_function_responses():
+            messages.append({
+                "type": "tool_result",
+                "agent": event.author,
+                "name": response.name
+            })
+        if event.partial:
+            if event.content and event.content.parts:
+                text = "".join(part.text or "" for part in event.content.parts)
+                if text:
+                    messages.append({
+                        "type": "agent_chunk",
+                        "agent": event.author,
+                        "text": text
+                    })
+            return messages
+    if event.is_final_response():
+        if event.content and event.content.parts:
+            messages.append({
+                "type": "agent",
+                "message": event.content.parts[0].text
+            })
+    return messages
+
+async def run_agent_turn(
+    runner: Runner,
+    session_id: str,
+    text: str,
+    stream: bool = False,
+    on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+):
+    """
+    Run a single agent turn without blocking the event loop.
+    
+    The turn is driven through the runner's native async generator, so other
+    sockets and HTTP requests on this worker keep making progress while a
+    model call is in flight. At most MAX_CONCURRENT_TURNS turns run at once;
+    later turns wait in arrival order.
+    
+    Args:
+        runner: The runner used to execute the agent
+        session_id: The session the turn belongs to
+        text: The user's message
+        stream: Whether to request partial (token-level) events from the model
+        on_queued: Awaited with the queue position if the turn has to wait
         
-        # Update session
-        session_service.create_session(
-            app_name=APP_NAME,
+    Yields:
+        The events generated by the agent
+    """
+    new_message = types.Content(role="user", parts=[types.Part(text=text)])
+    run_config = RunConfig(
+        streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE
+    )
+    async with turn_gate.slot(on_queued):
+        async for event in runner.run_async(
             user_id=USER_ID,
             session_id=session_id,
-            state=session.state
+            new_message=new_message,
+            run_config=run_config
+        ):
+            yield event
+
+def is_valid_session_id(session_id: Optional[str]) -> bool:
+    """
+    Check that a client-supplied session id has the form this app issues.
+    
+    Ids are checked before any session backend sees them, since durable
+    backends use them in file paths and keys.
+    
+    Args:
+        session_id: The session id presented by the client
+        
+    Returns:
+        True if the id is a canonical UUID string
+    """
+    if not isinstance(session_id, str):
+        return False
+    try:
+        return str(uuid.UUID(session_id)) == session_id
+    except ValueError:
+        return False
+
+def resolve_session(session_id: Optional[str] = None) -> Session:
+    """
+    Resolve the session a client presented, creating a new one if needed.
+    
+    Sessions are looked up directly by id in the session service's index, so
+    the cost does not depend on how many sessions are stored. Unknown ids are
+    not adopted, and malformed ids never reach the session service; the
+    client is issued a fresh id instead.
+    
+    Args:
+        session_id: The session id presented by the client, if any
+        
+    Returns:
+        The existing or newly created session
+    """
+    if is_valid_session_id(session_id):
+        session = session_service.get_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=session_id
         )
+        if session:
+            return session
+    
+    # Create new session with initial state
+    return session_service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=str(uuid.uuid4()),
+        state=initialize_state()
+    )
+
+@router.get("/")
+async def root():
+    """Root endpoint to verify API is running."""
+    return {"message": "Education Guide API is running"}
+
+@router.get("/ready")
+async def ready():
+    """Readiness probe: succeeds once the agent graph is loaded."""
+    body = {
+        "status": "ready" if warmup["runner"] is not None else "warming_up",
+        "agent_load_seconds": warmup["agent_load_seconds"],
+        "module_import_seconds": warmup["module_import_seconds"]
+    }
+    if warmup["error"]:
+        body["status"] = "error"
+        body["error"] = warmup["error"]
+    if warmup["runner"] is None:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@router.get("/api/metrics")
+async def metrics():
+    """Report admission-control, session cache and scheduler figures for this worker."""
+    report = {
+        **turn_gate.metrics(),
+        "connections": len(open_inboxes),
+        "inbox_depth": sum(inbox.qsize() for inbox in open_inboxes),
+        "inbox_size": WS_INBOX_SIZE
+    }
+    if hasattr(session_service, "metrics"):
+        report["sessions"] = session_service.metrics()
+    report["deadlines"] = deadline_scheduler.metrics()
+    return report
+
+def get_client_session(session_id: Optional[str]) -> Session:
+    """
+    Get the existing session an HTTP client named.
+    
+    Args:
+        session_id: The session id presented by the client
+        
+    Returns:
+        The session
+        
+    Raises:
+        HTTPException: 400 if no session id was given, 404 if it is unknown
+    """
+    if not session_id:
+        raise HTTPException(status_code=400, detail="session_id is required")
+    session = None
+    if is_valid_session_id(session_id):
+        session = session_service.get_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=session_id
+        )
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+def ingest_locations(session: Session, fixes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Queue a batch of location fixes for a session.
+    
+    Each fix is stamped with the time it was received, so fixes sent without
+    a timestamp can still be deduplicated against the next batch.
+    Near-duplicates of the last queued or stored fix are dropped; the rest
+    are written by the next flush_locations() call.
+    
+    Args:
+        session: The session the fixes belong to
+        fixes: The incoming fixes, oldest first
+        
+    Returns:
+        Dict with counts of received, accepted, queued and total locations
+    """
+    received_at = time.time()
+    fixes = [{**fix, RECEIVED_AT_KEY: received_at} for fix in fixes]
+    stored = session.state.get("locations", [])
+    pending = pending_locations.get(session.id, [])
+    last_fix = pending[-1] if pending else (stored[-1] if stored else None)
+    accepted = coalesce_fixes(
+        fixes,
+        last_fix=last_fix,
+        min_distance_meters=LOCATION_DEDUP_METERS,
+        min_interval_seconds=LOCATION_DEDUP_SECONDS
+    )
+    if accepted:
+        pending = cap_locations(pending + accepted, LOCATION_RETENTION)
+        pending_locations[session.id] = pending
+    
+    return {
+        "received": len(fixes),
+        "stored": len(accepted),
+        "queued": len(pending),
+        "total_locations": min(len(stored) + len(pending), LOCATION_RETENTION)
+    }
+
+def flush_locations(session_id: str) -> None:
+    """
+    Write a session's queued location fixes with a single state write.
+    
+    Args:
+        session_id: The session whose fixes to write
+    """
+    fixes = pending_locations.pop(session_id, None)
+    if not fixes:
+        return
+    session = session_service.get_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=session_id
+    )
+    if session is None:
+        return
+    locations, accepted = add_fixes(session.state.get("locations", []), fixes)
+    if accepted:
+        commit_state_delta(session_service, session, {"locations": locations})
+
+def flush_all_locations() -> None:
+    """Write the queued location fixes of every session."""
+    for session_id in list(pending_locations):
+        try:
+            flush_locations(session_id)
+        except Exception as e:
+            print(f"Error writing locations: {e}")
+
+@router.post("/api/location")
+async def receive_location(location_data: dict, session_id: Optional[str] = None):
+    """Endpoint to receive location data from the browser."""
+    try:
+        fixes = validate_location_fixes([location_data])
+    except StateValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    session = get_client_session(session_id)
+    try:
+        stats = ingest_locations(session, fixes)
         
-        return {"status": "success", "message": "Location data received"}
+        return {
+            "status": "success",
+            "message": "Location data received",
+            "session_id": session.id,
+            "stats": stats
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.websocket("/ws")
+@router.post("/api/location/batch")
+async def receive_location_batch(fixes: List[dict], session_id: Optional[str] = None):
+    """Endpoint to receive a batch of location fixes from the browser."""
+    try:
+        fixes = validate_location_fixes(fixes)
+    except StateValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    session = get_client_session(session_id)
+    try:
+        stats = ingest_locations(session, fixes)
+        
+        return {
+            "status": "success",
+            "message": "Location batch received",
+            "session_id": session.id,
+            "stats": stats
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/history")
+async def interaction_history(session_id: str, offset: int = 0, limit: int = 20):
+    """Endpoint to page through a session's full interaction history."""
+    if not is_valid_session_id(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    session = session_service.get_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=session_id
+    )
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return get_interaction_history(session.state, offset, min(limit, 100))
+
+@router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time communication."""
     await websocket.accept()
+    stream = wants_streaming(websocket)
     
+    # Negotiate the wire format; plain JSON text frames are the default
     try:
-        # Get or create session
-        sessions = session_service.list_sessions(
-            app_name=APP_NAME,
-            user_id=USER_ID
-        )
-        
-        if not sessions.sessions:
-            # Create new session with initial state
-            session_id = str(uuid.uuid4())
-            initial_state = initialize_state()
-            session = session_service.create_session(
-                app_name=APP_NAME,
-                user_id=USER_ID,
-                session_id=session_id,
-                state=initial_state
-            )
-        else:
-            # Use existing session
-            session = sessions.sessions[0]
-            session_id = session.id
-        
-        # Create runner
-        runner = Runner(
-            agent=root_agent,
+        codec = negotiate_codec(websocket.query_params)
+    except ValueError as e:
+        await websocket.send_json({
+            "type": "error",
+            "message": str(e)
+        })
+        await websocket.close(code=1003)
+        return
+    
+    # Messages wait in a bounded per-socket inbox and are processed one at a
+    # time, so a burst from one client cannot fan out into parallel turns
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=WS_INBOX_SIZE)
+    send_lock = asyncio.Lock()
+    client = {"session_id": None, "version": None}
+    
+    async def send(message: Dict[str, Any]) -> None:
+        payload = codec.encode(message)
+        async with send_lock:
+            if isinstance(payload, str):
+                await websocket.send_text(payload)
+            else:
+                await websocket.send_bytes(payload)
+    
+    async def send_state(since_version: Optional[int]) -> Session:
+        session = session_service.get_session(
             app_name=APP_NAME,
-            session_service=session_service
+            user_id=USER_ID,
+            session_id=client["session_id"]
         )
-        
-        # Send welcome message
-        await websocket.send_json({
-            "type": "system",
-            "message": "Welcome to the Education Guide! How can I help you today?"
+        state_message = build_state_message(session, since_version, DEFAULT_STATE)
+        client["version"] = state_message["version"]
+        await send(state_message)
+        return session
+    
+    async def notify_queued(position: int) -> None:
+        await send({
+            "type": "queued",
+            "position": position,
+            "message": f"The guide is busy; your message is queued at position {position}"
         })
-        
+    
+    async def process_inbox() -> None:
         while True:
+            text = await inbox.get()
             try:
-                # Receive message
-                data = await websocket.receive_text()
+                # Let the turn see the fixes received since the last flush
+                flush_locations(client["session_id"])
                 
                 # Run agent
-                for event in runner.run(
-                    user_id=USER_ID,
-                    session_id=session_id,
-                    new_message=data
+                runner = await get_runner()
+                async for event in run_agent_turn(
+                    runner, client["session_id"], text, stream, notify_queued
                 ):
-                    if event.is_final_response():
-                        if event.content and event.content.parts:
-                            await websocket.send_json({
-                                "type": "agent",
-                                "message": event.content.parts[0].text
-                            })
+                    for message in event_to_messages(event, stream):
+                        await send(message)
                 
-                # Send updated state
-                session = session_service.get_session(
-                    app_name=APP_NAME,
-                    user_id=USER_ID,
-                    session_id=session_id
-                )
-                await websocket.send_json({
-                    "type": "state",
-                    "state": session.state
-                })
+                # Mark the end of the turn for streaming clients
+                if stream:
+                    await send({"type": "turn_end"})
+                
+                # Send only the state keys changed during this turn
+                previous = client["version"]
+                session = await send_state(previous)
+                
+                # Reschedule the deadlines of the goals the turn wrote
+                changed = None if previous is None else changed_keys_since(session, previous)
+                goal_ids = None if changed is None else changed_goal_ids(changed)
+                if goal_ids is None:
+                    deadline_scheduler.sync_session(session.id, session.state)
+                elif goal_ids:
+                    deadline_scheduler.sync_session(session.id, session.state, goal_ids)
             except Exception as e:
-                await websocket.send_json({
+                await send({
                     "type": "error",
                     "message": str(e)
                 })
+            finally:
+                inbox.task_done()
+    
+    worker = None
+    open_inboxes.add(inbox)
+    try:
+        # Session handshake: resume the presented session or issue a new one
+        session = resolve_session(websocket.query_params.get("session_id"))
+        client["session_id"] = session.id
+        # Always plain JSON so the client can read the negotiated format
+        await websocket.send_json({
+            "type": "session",
+            "session_id": session.id,
+            "wire": codec.describe()
+        })
+        
+        # Send welcome message
+        await send({
+            "type": "system",
+            "message": "Welcome to the Education Guide! How can I help you today?"
+        })
+        
+        # Send the full state once so later updates can be deltas against it
+        state_message = build_state_message(session, defaults=DEFAULT_STATE)
+        client["version"] = state_message["version"]
+        await send(state_message)
+        
+        # Receive the session's deadline reminders, including missed ones
+        session_senders.setdefault(session.id, set()).add(send)
+        deadline_scheduler.sync_session(session.id, session.state)
+        for reminder in undelivered_reminders.pop(session.id, []):
+            await send(reminder)
+        
+        worker = asyncio.create_task(process_inbox())
+        while True:
+            # Receive message
+            message = parse_client_message(await websocket.receive_text())
+            
+            if message["type"] == "resync":
+                # Client asked for the changes since a version it holds
+                version = message.get("version")
+                if not isinstance(version, int):
+                    version = None
+                await send_state(version)
+                continue
+            
+            try:
+                inbox.put_nowait(str(message.get("text", "")))
+            except asyncio.QueueFull:
+                await send({
+                    "type": "busy",
+                    "message": "Too many pending messages; please wait for a reply before sending more",
+                    "inbox_size": WS_INBOX_SIZE
+                })
             
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
-        await websocket.send_json({
+        await send({
             "type": "error",
             "message": str(e)
         })
+    finally:
+        open_inboxes.discard(inbox)
+        senders = session_senders.get(client["session_id"])
+        if senders is not None:
+            senders.discard(send)
+            if not senders:
+                session_senders.pop(client["session_id"], None)
+        if worker:
+            worker.cancel()
+
+async def send_reminder(reminder: Dict[str, Any]) -> None:
+    """Send a reminder to its session's sockets, or keep it until one connects."""
+    senders = session_senders.get(reminder["session_id"])
+    message = {"type": "reminder", **reminder}
+    if not senders:
+        backlog = undelivered_reminders.setdefault(reminder["session_id"], [])
+        backlog.append(message)
+        del backlog[:-REMINDER_BACKLOG]
+        return
+    for send in list(senders):
+        try:
+            await send(message)
+        except Exception as e:
+            print(f"Error sending reminder: {e}")
+
+def record_reminders(reminders: List[Dict[str, Any]]) -> None:
+    """Record sent reminders in their sessions' state so they are not resent."""
+    by_session: Dict[str, List[Dict[str, Any]]] = {}
+    for reminder in reminders:
+        by_session.setdefault(reminder["session_id"], []).append(reminder)
+    for session_id, sent in by_session.items():
+        try:
+            session = session_service.get_session(
+                app_name=APP_NAME,
+                user_id=USER_ID,
+                session_id=session_id
+            )
+            if session is not None:
+                commit_state_delta(session_service, session, {
+                    REMINDERS_KEY: reminder_markers(session.state, sent)
+                })
+        except Exception as e:
+            print(f"Error recording reminders: {e}")
+
+async def sweep_reminders() -> None:
+    """Send due deadline reminders every DEADLINE_SWEEP_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(DEADLINE_SWEEP_INTERVAL)
+        reminders = deadline_scheduler.pop_due()
+        for reminder in reminders:
+            await send_reminder(reminder)
+        record_reminders(reminders)
+
+async def sweep_locations() -> None:
+    """Write queued location fixes every LOCATION_FLUSH_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(LOCATION_FLUSH_INTERVAL)
+        flush_all_locations()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Report import timings, start the agent warm-up and the background sweeps."""
+    print(f"web_app imported in {warmup['module_import_seconds']:.3f}s")
+    if AGENT_WARMUP != "lazy":
+        start_warm_up()
+    sweepers = [
+        asyncio.create_task(sweep_reminders()),
+        asyncio.create_task(sweep_locations())
+    ]
+    yield
+    for sweeper in sweepers:
+        sweeper.cancel()
+    flush_all_locations()
+    if warmup["task"] is not None and not warmup["task"].done():
+        warmup["task"].cancel()
+
+def create_app() -> FastAPI:
+    """
+    Create the FastAPI application.
+    
+    Returns:
+        The configured application
+    """
+    app = FastAPI(title="Education Guide Agent", lifespan=lifespan)
+    
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    return app
+
+# Create FastAPI app
+app = create_app()
+warmup["module_import_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    workers = int(os.getenv("WEB_WORKERS", "1"))
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if workers > 1 and backend != "database":
+        # Every other backend caches sessions in the worker process, so
+        # workers would serve stale state and overwrite each other's writes
+        raise SystemExit(
+            f"SESSION_BACKEND={backend} keeps sessions in each worker; "
+            "run one worker or set SESSION_BACKEND=database"
+        )
+    uvicorn.run(
+        "education_guide_agent.web_app:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers
+    )
@@ -0,0 +1,91 @@
+"""
+Hibernation and rehydration checks for the bounded session service.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+
+import pytest
+from google.adk.events import Event, EventActions
+
+from education_guide_agent.utils.bounded_session_service import BoundedSessionService
+
+APP_NAME = "education_guide"
+USER_ID = "user"
+
+@pytest.fixture
+def service(tmp_path):
+    service = BoundedSessionService(max_bytes=2000, idle_ttl=3600, hibernate_dir=str(tmp_path))
+    yield service
+    service.close()
+
+def make_event(position: int) -> Event:
+    return Event(
+        author="user",
+        invocation_id=f"turn-{position}",
+        actions=EventActions(state_delta={"notes": "x" * 200, "step": position})
+    )
+
+def create(service, n: int):
+    return service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"n": n})
+
+def test_least_recently_used_sessions_hibernate_over_budget(service):
+    sessions = [create(service, n) for n in range(20)]
+    for session in sessions:
+        service.append_event(session, make_event(0))
+
+    metrics = service.metrics()
+    assert metrics["sessions_hibernated"] > 0
+    assert metrics["resident_bytes"] <= service.max_bytes
+    assert metrics["sessions_resident"] + metrics["sessions_hibernated"] == 20
+    # The most recently used session stays resident
+    assert (APP_NAME, USER_ID, sessions[-1].id) in service._lru
+
+def test_hibernated_session_rehydrates_on_read(service):
+    first = create(service, 0)
+    service.append_event(first, make_event(0))
+    for n in range(1, 20):
+        create(service, n)
+    assert (APP_NAME, USER_ID, first.id) in service._hibernated
+
+    restored = service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=first.id)
+
+    assert restored.state["n"] == 0
+    assert restored.state["step"] == 0
+    assert [event.invocation_id for event in restored.events] == ["turn-0"]
+    assert (APP_NAME, USER_ID, first.id) not in service._hibernated
+
+def test_append_to_a_hibernated_session_rehydrates_it(service):
+    first = create(service, 0)
+    for n in range(1, 20):
+        create(service, n)
+    assert (APP_NAME, USER_ID, first.id) in service._hibernated
+
+    service.append_event(first, make_event(1))
+
+    restored = service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=first.id)
+    assert restored.state["step"] == 1
+    assert len(restored.events) == 1
+
+def test_idle_sessions_hibernate(tmp_path):
+    service = BoundedSessionService(max_bytes=10 ** 9, idle_ttl=0, hibernate_dir=str(tmp_path))
+    first = create(service, 0)
+    create(service, 1)
+
+    assert (APP_NAME, USER_ID, first.id) in service._hibernated
+    service.close()
+
+def test_list_and_delete_cover_hibernated_sessions(service):
+    sessions = [create(service, n) for n in range(20)]
+    hibernated = next(iter(service._hibernated))
+    path = service._path(hibernated)
+    assert os.path.exists(path)
+
+    listed = service.list_sessions(app_name=APP_NAME, user_id=USER_ID).sessions
+    assert {session.id for session in listed} == {session.id for session in sessions}
+
+    service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=hibernated[2])
+    assert not os.path.exists(path)
+    assert service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=hibernated[2]) is None
@@ -0,0 +1,118 @@
+"""
+Replay, snapshot and torn-tail checks for the event log session service.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+
+import pytest
+from google.adk.events import Event, EventActions
+
+from education_guide_agent.utils.event_log_session_service import (
+    LOG_FILE,
+    SNAPSHOT_FILE,
+    EventLogSessionService
+)
+from education_guide_agent.utils.state_sync import get_event_offset, get_state_version
+
+APP_NAME = "education_guide"
+USER_ID = "user"
+
+def make_event(position: int) -> Event:
+    return Event(
+        author="user",
+        invocation_id=f"turn-{position}",
+        actions=EventActions(state_delta={"progress": {"step": position}})
+    )
+
+def fill_session(service, count: int):
+    session = service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        state={"user_info": {"name": "Ada"}}
+    )
+    for position in range(count):
+        service.append_event(session, make_event(position))
+    return session
+
+def reload(service, session_id: str):
+    """Load a session the way a restarted process would."""
+    fresh = EventLogSessionService(
+        root=service.root,
+        snapshot_interval=service.snapshot_interval,
+        snapshot_events=service.snapshot_events
+    )
+    return fresh, fresh.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+
+def log_path(service, session_id: str) -> str:
+    return os.path.join(service.root, APP_NAME, USER_ID, session_id, LOG_FILE)
+
+def test_replay_restores_state_and_events(tmp_path):
+    service = EventLogSessionService(root=str(tmp_path), snapshot_interval=100)
+    session = fill_session(service, 5)
+
+    _, restored = reload(service, session.id)
+
+    assert restored.state == {"user_info": {"name": "Ada"}, "progress": {"step": 4}}
+    assert [event.invocation_id for event in restored.events] == [
+        f"turn-{position}" for position in range(5)
+    ]
+    assert get_state_version(restored) == 5
+
+def test_snapshot_bounds_replay_and_keeps_version_absolute(tmp_path):
+    service = EventLogSessionService(root=str(tmp_path), snapshot_interval=4, snapshot_events=2)
+    session = fill_session(service, 10)
+    assert os.path.exists(os.path.join(tmp_path, APP_NAME, USER_ID, session.id, SNAPSHOT_FILE))
+
+    fresh, restored = reload(service, session.id)
+
+    assert restored.state["progress"] == {"step": 9}
+    assert get_event_offset(restored) > 0
+    assert get_state_version(restored) == 10
+    events = fresh.list_events(app_name=APP_NAME, user_id=USER_ID, session_id=session.id).events
+    assert len(events) == 10
+
+def test_torn_tail_is_ignored_and_cut_before_next_append(tmp_path):
+    service = EventLogSessionService(root=str(tmp_path), snapshot_interval=100)
+    session = fill_session(service, 3)
+    path = log_path(service, session.id)
+    valid_size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"type":"event","event":{"author":')
+
+    fresh, restored = reload(service, session.id)
+    assert restored.state["progress"] == {"step": 2}
+    # Reads never modify the log
+    assert os.path.getsize(path) > valid_size
+
+    fresh.append_event(restored, make_event(3))
+
+    _, again = reload(fresh, session.id)
+    assert again.state["progress"] == {"step": 3}
+    assert len(again.events) == 4
+    with open(path, "rb") as f:
+        assert all(line.endswith(b"}\n") for line in f)
+
+def test_recreating_a_session_replaces_its_log(tmp_path):
+    service = EventLogSessionService(root=str(tmp_path), snapshot_interval=100)
+    session = fill_session(service, 3)
+
+    service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        state={"fresh": True},
+        session_id=session.id
+    )
+
+    _, restored = reload(service, session.id)
+    assert restored.state == {"fresh": True}
+    assert restored.events == []
+
+@pytest.mark.parametrize("session_id", ["..", "a/b", "", "."])
+def test_path_like_keys_are_rejected(tmp_path, session_id):
+    service = EventLogSessionService(root=str(tmp_path))
+
+    with pytest.raises(ValueError):
+        service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
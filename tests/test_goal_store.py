@@ -0,0 +1,113 @@
+"""
+Per-goal storage, lookup and rollback checks for the goal store.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+
+from education_guide_agent.utils.goal_store import (
+    INDEX_KEY,
+    LEGACY_GOALS_KEY,
+    GoalStore,
+    changed_goal_ids,
+    goal_key,
+    iter_goals
+)
+from education_guide_agent.utils.state_utils import StateTransaction, state_transaction
+
+def make_goal(goal_type: str, deadline: str, priority: str = "high", status: str = "pending"):
+    return {
+        "type": goal_type,
+        "description": f"{goal_type} by {deadline}",
+        "deadline": deadline,
+        "priority": priority,
+        "status": status,
+        "milestones": []
+    }
+
+def fill(state, goals):
+    store = GoalStore(state)
+    for goal in goals:
+        store.add(goal)
+    return store
+
+def test_add_writes_only_the_goal_and_index():
+    state = {}
+    fill(state, [make_goal("essay", "2026-12-01"), make_goal("test_prep", "2026-11-01")])
+    transaction = StateTransaction(state)
+
+    GoalStore(transaction).add(make_goal("essay", "2026-10-01"))
+
+    assert set(transaction.changes()) == {goal_key(2), INDEX_KEY}
+    assert [goal["id"] for goal in iter_goals(transaction)] == [0, 1, 2]
+
+def test_counts_find_and_upcoming():
+    store = fill({}, [
+        make_goal("essay", "2026-12-01"),
+        make_goal("test_prep", "2026-11-01", priority="low"),
+        make_goal("essay", "2026-10-01", status="completed"),
+        make_goal("essay", "not a date")
+    ])
+
+    assert store.count("type") == {"essay": 3, "test_prep": 1}
+    assert store.count("priority", "low") == 1
+    assert [goal["id"] for goal in store.find("type", "essay")] == [0, 2, 3]
+    assert [goal["id"] for goal in store.upcoming(limit=5)] == [1, 0]
+
+def test_set_field_moves_the_goal_between_lookups():
+    state = {}
+    store = fill(state, [make_goal("essay", "2026-12-01"), make_goal("essay", "2026-11-01")])
+
+    store.set_field(1, "status", "completed")
+
+    assert state[goal_key(1)]["status"] == "completed"
+    assert store.count("status") == {"pending": 1, "completed": 1}
+    assert [goal["id"] for goal in store.find("status", "completed")] == [1]
+    assert [goal["id"] for goal in GoalStore(state).upcoming()] == [0]
+
+def test_set_field_rejects_unknown_goals_and_fields():
+    store = fill({}, [make_goal("essay", "2026-12-01")])
+
+    with pytest.raises(KeyError):
+        store.set_field(5, "status", "completed")
+    with pytest.raises(ValueError):
+        store.set_field(0, "description", "other")
+
+def test_rolled_back_add_leaves_no_trace():
+    state = {}
+    fill(state, [make_goal("essay", "2026-12-01")])
+    before = dict(state)
+
+    with pytest.raises(RuntimeError):
+        with state_transaction(state) as transaction:
+            GoalStore(transaction).add(make_goal("test_prep", "2026-01-01"))
+            raise RuntimeError("tool failed")
+
+    assert state == before
+    store = GoalStore(state)
+    assert len(store) == 1
+    assert store.count("type") == {"essay": 1}
+    # Lookups cached for the discarded revision are not used
+    assert [goal["id"] for goal in store.upcoming()] == [0]
+    assert store.find("type", "test_prep") == []
+
+def test_legacy_list_is_read_and_moved_on_write():
+    state = {LEGACY_GOALS_KEY: [make_goal("essay", "2026-12-01"), make_goal("essay", "2026-11-01")]}
+
+    store = GoalStore(state)
+    assert [goal["id"] for goal in iter_goals(state)] == [0, 1]
+    assert [goal["id"] for goal in store.upcoming()] == [1, 0]
+    assert set(state) == {LEGACY_GOALS_KEY}
+
+    store.add(make_goal("test_prep", "2026-10-01"))
+
+    assert state[LEGACY_GOALS_KEY] == []
+    assert [goal["id"] for goal in iter_goals(state)] == [0, 1, 2]
+    assert GoalStore(state).count("type") == {"essay": 2, "test_prep": 1}
+
+def test_changed_goal_ids():
+    assert changed_goal_ids([goal_key(3), INDEX_KEY, "user_info"]) == {3}
+    assert changed_goal_ids(["user_info"]) == set()
+    assert changed_goal_ids([LEGACY_GOALS_KEY]) is None
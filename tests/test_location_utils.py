@@ -0,0 +1,83 @@
+"""
+Coalescing and retention checks for stored location fixes.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+from education_guide_agent.utils import location_utils
+from education_guide_agent.utils.location_utils import (
+    RECEIVED_AT_KEY,
+    add_fixes,
+    cap_locations,
+    coalesce_fixes,
+    get_fix_time
+)
+
+def fix(latitude: float, longitude: float, timestamp=None):
+    data = {"latitude": latitude, "longitude": longitude}
+    if timestamp is not None:
+        data["timestamp"] = timestamp
+    return data
+
+def test_near_duplicates_within_the_window_are_dropped():
+    fixes = [
+        fix(51.5, -0.12, 1_000),
+        fix(51.50001, -0.12, 1_010),
+        fix(51.5, -0.12, 1_100)
+    ]
+
+    kept = coalesce_fixes(fixes, min_distance_meters=25, min_interval_seconds=60)
+
+    assert kept == [fixes[0], fixes[2]]
+
+def test_distant_fixes_are_kept():
+    fixes = [fix(51.5, -0.12, 1_000), fix(51.6, -0.12, 1_001)]
+
+    assert coalesce_fixes(fixes) == fixes
+
+def test_fixes_are_compared_with_the_last_stored_fix():
+    stored = fix(51.5, -0.12, 1_000)
+
+    assert coalesce_fixes([fix(51.5, -0.12, 1_005)], last_fix=stored) == []
+
+def test_fixes_without_coordinates_are_dropped():
+    assert coalesce_fixes([{"timestamp": 1_000}, {"coords": {"latitude": "x"}}]) == []
+
+def test_browser_shape_and_millisecond_timestamps():
+    browser_fix = {"coords": {"latitude": 51.5, "longitude": -0.12}, "timestamp": 1_700_000_000_000}
+
+    assert get_fix_time(browser_fix, 0) == 1_700_000_000
+    assert coalesce_fixes([browser_fix]) == [browser_fix]
+
+def test_receive_time_stands_in_for_a_missing_timestamp():
+    stored = {**fix(51.5, -0.12), RECEIVED_AT_KEY: 1_000.0}
+    repeat = {**fix(51.5, -0.12), RECEIVED_AT_KEY: 1_030.0}
+    later = {**fix(51.5, -0.12), RECEIVED_AT_KEY: 1_100.0}
+
+    assert coalesce_fixes([repeat], last_fix=stored) == []
+    assert coalesce_fixes([later], last_fix=stored) == [later]
+
+def test_cap_keeps_the_most_recent():
+    locations = [fix(n, 0) for n in range(5)]
+
+    assert cap_locations(locations, 3) == locations[2:]
+    assert cap_locations(locations, 0) == locations
+
+def test_add_fixes_caps_and_leaves_the_stored_list(monkeypatch):
+    monkeypatch.setattr(location_utils, "LOCATION_RETENTION", 3)
+    stored = [fix(n, 0, 1_000 + n) for n in range(3)]
+
+    locations, accepted = add_fixes(stored, [fix(10, 0, 2_000), fix(10, 0, 2_001)])
+
+    assert accepted == [fix(10, 0, 2_000)]
+    assert locations == stored[1:] + accepted
+    assert len(stored) == 3
+
+def test_add_fixes_without_accepted_fixes_returns_the_stored_list():
+    stored = [fix(51.5, -0.12, 1_000)]
+
+    locations, accepted = add_fixes(stored, [fix(51.5, -0.12, 1_001)])
+
+    assert accepted == []
+    assert locations is stored
@@ -0,0 +1,157 @@
+"""
+Round-trip and malformed-input checks for the binary session snapshot format.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+
+from education_guide_agent.utils import history_store
+from education_guide_agent.utils.session_transfer import (
+    HEADER,
+    TABLE_ENTRY,
+    SnapshotFormatError,
+    export_session,
+    import_session,
+    read_snapshot
+)
+from education_guide_agent.utils.state_sync import get_state_version
+
+APP_NAME = "education_guide"
+USER_ID = "user"
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(history_store, "HISTORY_HOT_LIMIT", 4)
+    monkeypatch.setattr(history_store, "HISTORY_SEGMENT_SIZE", 2)
+    return tmp_path
+
+def make_session(service):
+    session = service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        state={"user_info": {"name": "Ada"}}
+    )
+    for position in range(3):
+        service.append_event(session, Event(
+            author="user",
+            invocation_id=f"turn-{position}",
+            actions=EventActions(state_delta={"progress": {"step": position}})
+        ))
+    return service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+
+def add_section(blob: bytes, tag: bytes, payload: bytes) -> bytes:
+    """Rebuild a snapshot with one more raw section appended to its table."""
+    _, version, count = HEADER.unpack_from(blob, 0)
+    entries = [
+        TABLE_ENTRY.unpack_from(blob, HEADER.size + TABLE_ENTRY.size * position)
+        for position in range(count)
+    ]
+    payloads = [blob[offset:offset + length] for _, _, offset, length in entries]
+    sections = [(entry[0], entry[1], data) for entry, data in zip(entries, payloads)]
+    sections.append((tag, 0, payload))
+
+    offset = HEADER.size + TABLE_ENTRY.size * len(sections)
+    parts = [HEADER.pack(b"EGSN", version, len(sections))]
+    for section_tag, codec, data in sections:
+        parts.append(TABLE_ENTRY.pack(section_tag, codec, offset, len(data)))
+        offset += len(data)
+    parts.extend(data for _, _, data in sections)
+    return b"".join(parts)
+
+def test_snapshot_round_trip():
+    session = make_session(InMemorySessionService())
+
+    snapshot = read_snapshot(export_session(session))
+
+    assert snapshot["meta"]["id"] == session.id
+    assert snapshot["meta"]["version"] == get_state_version(session)
+    assert snapshot["state"] == session.state
+    assert len(snapshot["events"]) == len(session.events)
+    assert snapshot["segments"] == []
+
+def test_import_restores_state_events_and_version():
+    session = make_session(InMemorySessionService())
+    target = InMemorySessionService()
+
+    restored = import_session(target, export_session(session))
+
+    assert restored.id == session.id
+    assert restored.state == session.state
+    assert [event.invocation_id for event in restored.events] == [
+        event.invocation_id for event in session.events
+    ]
+    assert get_state_version(restored) == get_state_version(session)
+
+def test_import_refuses_existing_session_unless_replacing():
+    session = make_session(InMemorySessionService())
+    target = InMemorySessionService()
+    blob = export_session(session)
+    import_session(target, blob)
+
+    with pytest.raises(ValueError):
+        import_session(target, blob)
+    assert import_session(target, blob, replace=True).id == session.id
+
+def test_round_trip_carries_spilled_history_segments(history_dir):
+    container = {}
+    for position in range(7):
+        history_store.append_history(container, {"action": f"step {position}"})
+    service = InMemorySessionService()
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state=container)
+    expected = history_store.read_history(session.state, 0, 100)
+
+    blob = export_session(session)
+    assert len(read_snapshot(blob)["segments"]) == len(container[history_store.INDEX_KEY]["segments"])
+
+    history_store.HISTORY_DIR = str(history_dir / "other_node")
+    restored = import_session(InMemorySessionService(), blob)
+    assert history_store.read_history(restored.state, 0, 100) == expected
+
+@pytest.mark.parametrize("length", [0, 3, HEADER.size + 1, 40])
+def test_truncated_snapshot_is_rejected(length):
+    blob = export_session(make_session(InMemorySessionService()))
+
+    with pytest.raises(SnapshotFormatError):
+        read_snapshot(blob[:length])
+
+def test_foreign_blob_is_rejected():
+    with pytest.raises(SnapshotFormatError):
+        read_snapshot(b"NOPE" + bytes(64))
+
+def test_newer_format_version_is_rejected():
+    blob = bytearray(export_session(make_session(InMemorySessionService())))
+    blob[4:6] = (999).to_bytes(2, "little")
+
+    with pytest.raises(SnapshotFormatError):
+        read_snapshot(bytes(blob))
+
+def test_unknown_section_is_skipped():
+    session = make_session(InMemorySessionService())
+    blob = add_section(export_session(session), b"XTRA", b"from a newer writer")
+
+    snapshot = read_snapshot(blob)
+
+    assert snapshot["state"] == session.state
+    assert len(snapshot["events"]) == len(session.events)
+
+def test_missing_required_section_is_rejected():
+    blob = export_session(make_session(InMemorySessionService()))
+    _, version, count = HEADER.unpack_from(blob, 0)
+    # Drop the last table entry (the events) by shrinking the section count
+    shortened = HEADER.pack(b"EGSN", version, count - 1) + blob[HEADER.size:]
+
+    with pytest.raises(SnapshotFormatError):
+        read_snapshot(shortened)
+
+def test_corrupt_section_is_rejected():
+    blob = bytearray(export_session(make_session(InMemorySessionService())))
+    _, _, offset, length = TABLE_ENTRY.unpack_from(blob, HEADER.size)
+    blob[offset:offset + length] = bytes(length)
+
+    with pytest.raises(SnapshotFormatError):
+        read_snapshot(bytes(blob))
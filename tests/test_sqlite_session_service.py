@@ -0,0 +1,110 @@
+"""
+Write-behind, re-create and cache checks for the SQLite session service.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+from google.adk.events import Event, EventActions
+
+from education_guide_agent.utils.sqlite_session_service import SqliteSessionService
+
+APP_NAME = "education_guide"
+USER_ID = "user"
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.sqlite")
+
+def open_service(db_path: str, **kwargs) -> SqliteSessionService:
+    # A long interval keeps the background writer out of the way; tests flush
+    return SqliteSessionService(db_path, flush_interval=3600, **kwargs)
+
+def make_event(position: int) -> Event:
+    return Event(
+        author="user",
+        invocation_id=f"turn-{position}",
+        actions=EventActions(state_delta={"progress": {"step": position}})
+    )
+
+def get(service, session_id: str):
+    return service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+
+def test_writes_reach_the_database_only_on_flush(db_path):
+    service = open_service(db_path)
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"a": 1})
+    service.append_event(session, make_event(0))
+
+    reader = open_service(db_path)
+    assert get(reader, session.id) is None
+    reader.close()
+
+    service.flush()
+
+    reader = open_service(db_path)
+    restored = get(reader, session.id)
+    assert restored.state == {"a": 1, "progress": {"step": 0}}
+    assert [event.invocation_id for event in restored.events] == ["turn-0"]
+    reader.close()
+    service.close()
+
+def test_close_flushes_pending_writes(db_path):
+    service = open_service(db_path)
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    for position in range(3):
+        service.append_event(session, make_event(position))
+    service.close()
+
+    reader = open_service(db_path)
+    assert get(reader, session.id).state["progress"] == {"step": 2}
+    reader.close()
+
+def test_recreating_a_session_replaces_its_rows(db_path):
+    service = open_service(db_path)
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"old": True})
+    service.append_event(session, make_event(0))
+    service.flush()
+
+    service.create_session(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        state={"new": True},
+        session_id=session.id
+    )
+    service.close()
+
+    reader = open_service(db_path)
+    restored = get(reader, session.id)
+    assert restored.state == {"new": True}
+    assert restored.events == []
+    reader.close()
+
+def test_deleted_session_is_gone_before_and_after_flush(db_path):
+    service = open_service(db_path)
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    service.flush()
+
+    service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    assert get(service, session.id) is None
+    service.close()
+
+    reader = open_service(db_path)
+    assert get(reader, session.id) is None
+    reader.close()
+
+def test_cache_is_bounded_and_keeps_unflushed_sessions(db_path):
+    service = open_service(db_path, cache_size=2)
+    ids = [
+        service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"n": n}).id
+        for n in range(5)
+    ]
+    # Nothing is flushed yet, so every session stays cached
+    assert len(service._sessions) == 5
+
+    service.flush()
+    assert len(service._sessions) == 2
+
+    # Dropped sessions are reloaded from the database on demand
+    assert [get(service, session_id).state["n"] for session_id in ids] == list(range(5))
+    service.close()
@@ -0,0 +1,120 @@
+"""
+Commit and rollback checks for state transactions.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+
+import pytest
+from google.adk.sessions import InMemorySessionService
+
+from education_guide_agent.utils import history_store
+from education_guide_agent.utils.state_utils import (
+    StateTransaction,
+    merge_patch,
+    state_transaction,
+    update_interaction_history,
+    update_user_info
+)
+
+APP_NAME = "education_guide"
+USER_ID = "user"
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(history_store, "HISTORY_HOT_LIMIT", 3)
+    monkeypatch.setattr(history_store, "HISTORY_SEGMENT_SIZE", 2)
+    return tmp_path / "history"
+
+def segment_files(directory) -> list:
+    return [name for _, _, names in os.walk(directory) for name in names]
+
+def test_writes_are_staged_until_commit():
+    state = {"user_info": {"name": "Ada"}}
+
+    with state_transaction(state) as transaction:
+        update_user_info(transaction, {"grade_level": 12})
+        assert transaction["user_info"]["grade_level"] == 12
+        assert "grade_level" not in state["user_info"]
+
+    assert state["user_info"] == {"name": "Ada", "grade_level": 12}
+
+def test_failed_block_keeps_nothing():
+    state = {"user_info": {"name": "Ada"}}
+    original = state["user_info"]
+
+    with pytest.raises(RuntimeError):
+        with state_transaction(state) as transaction:
+            update_user_info(transaction, {"name": "Grace"})
+            merge_patch(transaction, {"session_data": {"user_profile": {"academic": {"gpa": 4}}}})
+            raise RuntimeError("tool failed")
+
+    assert state == {"user_info": {"name": "Ada"}}
+    assert state["user_info"] is original
+
+def test_rollback_runs_undo_steps_newest_first():
+    steps = []
+    transaction = StateTransaction({})
+    transaction.on_rollback(lambda: steps.append("first"))
+    transaction.on_rollback(lambda: steps.append("second"))
+    transaction["key"] = 1
+
+    transaction.rollback()
+
+    assert steps == ["second", "first"]
+    assert transaction.changes() == {}
+
+def test_helpers_reraise_inside_a_transaction():
+    with pytest.raises(TypeError):
+        with state_transaction({}) as transaction:
+            update_user_info(transaction, None)
+
+def test_helpers_report_their_own_failures(capsys):
+    state = {}
+
+    update_user_info(state, None)
+
+    assert "Error updating user info" in capsys.readouterr().out
+    assert state == {}
+
+def test_commit_to_a_session_is_one_event():
+    service = InMemorySessionService()
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state={})
+
+    with state_transaction(session, service) as transaction:
+        update_user_info(transaction, {"name": "Ada"})
+        update_interaction_history(transaction, "profile_updated", {"field": "name"})
+
+    stored = service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    assert len(stored.events) == 1
+    assert set(stored.events[0].actions.state_delta) == {"user_info", "session_data"}
+    assert stored.state["user_info"]["name"] == "Ada"
+
+def test_session_commit_requires_a_service():
+    session = InMemorySessionService().create_session(app_name=APP_NAME, user_id=USER_ID)
+
+    with pytest.raises(ValueError):
+        with state_transaction(session):
+            pass
+
+def test_rollback_removes_spilled_history_segment(history_dir):
+    state = {}
+    for position in range(3):
+        update_interaction_history(state, "step", {"position": position})
+    assert segment_files(history_dir) == []
+
+    with pytest.raises(RuntimeError):
+        with state_transaction(state) as transaction:
+            update_interaction_history(transaction, "step", {"position": 3})
+            assert len(segment_files(history_dir)) == 1
+            raise RuntimeError("tool failed")
+
+    assert segment_files(history_dir) == []
+    assert history_store.INDEX_KEY not in state["session_data"]
+
+    update_interaction_history(state, "step", {"position": 3})
+    assert len(segment_files(history_dir)) == 1
+    assert history_store.history_length(state["session_data"]) == 4